@@ -4,12 +4,34 @@ hyperprophet.engines
 
 Compute engines for Prophet.
 """
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import io
 import os
-import tempfile
+import json
+import pickle
+import hashlib
 import zipfile
 import time
+import asyncio
+import contextlib
+import copy
+import functools
+import threading
+import itertools
+import logging
+import random
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+
+logger = logging.getLogger("hyperprophet")
 
 ENGINES = {}
 def make_engine(engine=None):
@@ -32,10 +54,50 @@ def register_engine(name, engine):
     ENGINES[name] = engine
 
 class BaseEngine:
+    # Engines that can keep the fitted models, see fit_models
+    supports_models = False
+
     def forecast(self, df_fit, df_predict, options):
         raise NotImplementedError()
 
-class ZeroEngine:
+    def fit_models(self, df_fit, options):
+        """Fits the model of every key in df_fit.
+
+        Returns a dict with the fitted model of each key, which can be
+        passed to predict_models to forecast many times without refitting.
+        Only supported by the engines with supports_models set.
+        """
+        raise NotImplementedError()
+
+    def predict_models(self, models, df_predict):
+        """Forecasts the keys in df_predict with the models returned by
+        fit_models.
+        """
+        raise NotImplementedError()
+
+    def predict_models_iter(self, models, df_predict):
+        """Yields a tuple (key, forecast_df) for each key in df_predict, like
+        forecast_iter, with the models returned by fit_models.
+        """
+        raise NotImplementedError()
+
+    def forecast_iter(self, df_fit, df_predict, options):
+        """Yields a tuple (key, forecast_df) for each key in df_predict.
+
+        Engines that compute the forecasts one key at a time override this
+        to yield every forecast as soon as it is available. The default
+        implementation computes the complete forecast and splits it by key.
+        """
+        df = self.forecast(df_fit, df_predict, options)
+        yield from df.groupby('key')
+
+    def get_config(self):
+        """Returns a dict with the settings of the engine that can change
+        its forecasts, which are part of the keys of the cached forecasts.
+        """
+        return {}
+
+class ZeroEngine(BaseEngine):
     """Forecast zero for all values.
 
     Used for testing.
@@ -62,8 +124,124 @@ class ZeroEngine:
 
 class LocalEngine(BaseEngine):
     """Forecast locally using Prophet.
+
+    Parameters
+    ----------
+    stan_backend:
+        Name of the backend used to fit the model of every key, one of
+        fbprophet.models.StanBackendEnum. 'NUMPY' fits the models in-process
+        without a compiled Stan model. Defaults to the first backend that
+        can be loaded.
+
+    warm_start:
+        Optional cache (e.g. MemoryCache or DiskCache) of the fitted
+        parameters of every key. When a key is forecast again with the same
+        options, the fit starts from its previous parameters, which takes a
+        lot fewer iterations when the data has changed only a little. Use a
+        DiskCache to keep the parameters between runs.
+
+    seed:
+        Default seed of the uncertainty intervals, an int, when the options
+        don't have one. Every key gets its own random streams, derived from
+        the seed and the key, so the forecast of a key is reproducible and
+        doesn't depend on the other keys or on the process that computes it.
     """
+    supports_models = True
+
+    def __init__(self, stan_backend=None, warm_start=None, seed=None):
+        self.stan_backend = stan_backend
+        self.warm_start = warm_start
+        self.seed = seed
+
+    def get_config(self):
+        return {
+            "stan_backend": self.stan_backend,
+            "warm_start": self.warm_start is not None,
+            "seed": self.seed,
+        }
+
     def forecast(self, df_fit, df_predict, options):
+        return pd.concat(df for _key, df in self.forecast_iter(df_fit, df_predict, options))
+
+    def forecast_iter(self, df_fit, df_predict, options):
+        keys, fit_parts, predict_parts = self.split_by_key(df_fit, df_predict)
+        with self.mapper() as map_func:
+            dfs = self.map_series(map_func, keys, fit_parts, predict_parts, options)
+            yield from zip(keys, dfs)
+
+    def fit_models(self, df_fit, options):
+        fit_parts = OrderedDict(iter(df_fit.groupby('key')))
+        keys = list(fit_parts)
+        with self.mapper() as map_func:
+            models = self.map_keys(map_func, self._fit_key, keys, [fit_parts.values()], options)
+            return OrderedDict((key, self.import_model(m)) for key, m in zip(keys, models))
+
+    def predict_models(self, models, df_predict):
+        return pd.concat(df for _key, df in self.predict_models_iter(models, df_predict))
+
+    def predict_models_iter(self, models, df_predict):
+        predict_parts = OrderedDict(iter(df_predict.groupby('key')))
+        if any(key not in models for key in predict_parts):
+            raise ValueError("Can't forecast for a key that is not part of the dataframe given to fit")
+
+        keys = list(predict_parts)
+        with self.mapper() as map_func:
+            dfs = map_func(
+                self._predict_model,
+                [self.export_model(models[key]) for key in keys],
+                keys,
+                predict_parts.values())
+            yield from zip(keys, dfs)
+
+    @contextlib.contextmanager
+    def mapper(self):
+        """Context manager that returns the function used to map the work
+        over the keys, the builtin map for LocalEngine.
+        """
+        yield map
+
+    def map_series(self, map_func, keys, fit_parts, predict_parts, options):
+        """Forecasts every key, calling map_func to apply the forecasting
+        function over the keys.
+
+        Yields the forecasts in the order of the keys.
+        """
+        return self.map_keys(map_func, self._forecast_key, keys, [fit_parts, predict_parts], options)
+
+    def map_keys(self, map_func, func, keys, parts, options):
+        """Calls map_func to apply func over the keys.
+
+        func is called with a key, its item of each list in parts, the
+        options and the warm start parameters of the key, and returns a
+        tuple (result, params) with the result and the fitted parameters of
+        the key. Yields the results in the order of the keys.
+        """
+        inits = [self.get_warm_start(key, options) for key in keys]
+        results = map_func(func, keys, *parts, repeat(options), inits)
+        # the warm start parameters are saved here rather than in func,
+        # which may run in another process
+        for key, (result, params) in zip(keys, results):
+            self.set_warm_start(key, options, params)
+            yield result
+
+    def warm_start_key(self, key, options):
+        return hash_options({"key": key, "options": options})
+
+    def get_warm_start(self, key, options):
+        if self.warm_start is None:
+            return None
+        return self.warm_start.get(self.warm_start_key(key, options))
+
+    def set_warm_start(self, key, options, params):
+        if self.warm_start is not None:
+            self.warm_start.set(self.warm_start_key(key, options), params)
+
+    def split_by_key(self, df_fit, df_predict):
+        """Splits the fit and predict dataframes into per-key parts.
+
+        Returns a tuple of three lists (keys, fit_parts, predict_parts), in
+        the order of the keys in df_predict.
+        """
         df_fit_parts = dict(iter(df_fit.groupby('key')))
         df_predict_parts = dict(iter(df_predict.groupby('key')))
 
@@ -72,30 +250,350 @@ class LocalEngine(BaseEngine):
         if missing_keys:
             raise ValueError("Can't forecast for a key that is not part of the dataframe given to fit")
 
-        dfs = [self.forecast_one_series(k, df_fit_parts[k], df_predict_parts[k], options) for k in df_predict_parts]
-        return pd.concat(dfs)
+        keys = list(df_predict_parts)
+        fit_parts = [df_fit_parts[k] for k in keys]
+        predict_parts = [df_predict_parts[k] for k in keys]
+        return keys, fit_parts, predict_parts
 
-    def forecast_one_series(self, key, df_fit, df_predict, options):
-        # TODO: use the options
-        from fbprophet import Prophet
-
-        df_fit = df_fit.drop('key', axis=1)
-        df_predict = df_predict.drop('key', axis=1)
+    def make_model(self, options):
+        """Returns a new Prophet model with the given options.
+        """
+        from .fbprophet import Prophet
 
+        # options is shared by all the keys, don't modify it
+        options = dict(options)
         seasonalities = options.pop('seasonalities', {})
         extra_regressors = options.pop('extra_regressors', {})
+        options.setdefault('stan_backend', self.stan_backend)
+        options.setdefault('seed', self.seed)
 
         m = Prophet(**options)
         m.seasonalities = seasonalities
         m.extra_regressors = extra_regressors
-        m.fit(df_fit)
-        forecast = m.predict(df_predict)
+        return m
+
+    def fit_model(self, df_fit, options, init=None):
+        """Returns a model fit to the data of a key.
+        """
+        m = self.make_model(options)
+        m.fit(df_fit.drop('key', axis=1), init=init)
+        return m
+
+    def export_model(self, m):
+        """Returns the fitted model m in the form in which it is passed
+        between the processes of the engine.
+        """
+        return m
+
+    def import_model(self, m):
+        """Returns a model passed between processes, see export_model.
+        """
+        return m
+
+    def _fit_key(self, key, df_fit, options, init):
+        # Returns a tuple (exported_model, warm_start_params) for the key
+        from .fbprophet.utilities import warm_start_params
+
+        m = self.fit_model(df_fit, options, init=init)
+        return self.export_model(m), warm_start_params(m)
+
+    def _forecast_key(self, key, df_fit, df_predict, options, init):
+        # Returns a tuple (forecast, warm_start_params) for the key
+        from .fbprophet.utilities import warm_start_params
+
+        m = self.fit_model(df_fit, options, init=init)
+        return self._predict(m, key, df_predict), warm_start_params(m)
+
+    def _predict_model(self, m, key, df_predict):
+        return self._predict(self.import_model(m), key, df_predict)
+
+    def key_seed(self, seed, key):
+        """Returns the seed of the model of a key, derived from the seed of
+        the options and from a stable hash of the key.
+        """
+        from .fbprophet.utilities import spawn_seed
+        return spawn_seed(seed, int(hash_options({"key": str(key)})[:15], 16))
+
+    def _predict(self, m, key, df_predict):
+        if m.seed is not None:
+            # Leave the seed of the model unchanged, it may be predicted again
+            m = copy.copy(m)
+            m.seed = self.key_seed(m.seed, key)
+        forecast = m.predict(df_predict.drop('key', axis=1))
 
         # Add key as the first column
         columns = ['key'] + list(forecast.columns)
         forecast['key'] = key
         return forecast[columns]
 
+class ParallelLocalEngine(LocalEngine):
+    """Forecast locally using Prophet, fitting the keys in parallel on
+    multiple cores.
+
+    The keys are distributed over a pool of worker processes. The output
+    is in the same order as that of LocalEngine, irrespective of the order
+    in which the workers finish.
+
+    Parameters
+    ----------
+    max_workers:
+        Number of worker processes. Defaults to the number of CPUs.
+
+    chunksize:
+        Number of keys sent to a worker at a time. Larger values reduce
+        the inter-process communication overhead when there are many
+        small series.
+
+    stan_backend, warm_start, seed:
+        As in LocalEngine. The warm start cache is only accessed from the
+        main process. With a seed, the forecasts are the same as those of
+        LocalEngine.
+    """
+    def __init__(self, max_workers=None, chunksize=1, stan_backend=None, warm_start=None,
+                 seed=None):
+        super().__init__(stan_backend=stan_backend, warm_start=warm_start, seed=seed)
+        if chunksize < 1:
+            raise ValueError("chunksize must be >= 1")
+        self.max_workers = max_workers
+        self.chunksize = chunksize
+
+    def __getstate__(self):
+        # The engine is sent to the workers with every task, leave out the
+        # warm start cache, which is only used in the main process
+        state = self.__dict__.copy()
+        state['warm_start'] = None
+        return state
+
+    @contextlib.contextmanager
+    def mapper(self):
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            yield functools.partial(executor.map, chunksize=self.chunksize)
+
+    def export_model(self, m):
+        # The fitted models are sent between processes as bytes, which is
+        # a lot smaller than the pickle of the model
+        from .fbprophet.serialize import model_to_bytes
+        return model_to_bytes(m)
+
+    def import_model(self, m):
+        from .fbprophet.serialize import model_from_bytes
+        return model_from_bytes(m)
+
+def hash_dataframe(df):
+    """Returns a stable hash of the contents of a dataframe.
+
+    The hash includes the column names, the dtypes and the index, and it
+    is the same across processes.
+    """
+    h = hashlib.sha256(_hash_header(df))
+    h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return h.hexdigest()
+
+def hash_dataframe_by_key(df):
+    """Returns a dict with a stable hash of the rows of each key in the
+    dataframe.
+
+    Unlike hash_dataframe, the index is not part of the hash, so that the
+    hash of a key doesn't change when the rows of other keys change.
+    """
+    header = _hash_header(df)
+    row_hashes = pd.util.hash_pandas_object(df, index=False).values
+    return {
+        key: hashlib.sha256(header + row_hashes[ix].tobytes()).hexdigest()
+        for key, ix in df.groupby('key').indices.items()
+    }
+
+def _hash_header(df):
+    header = [[str(c) for c in df.columns], [str(t) for t in df.dtypes]]
+    return json.dumps(header).encode("utf-8")
+
+def hash_options(options):
+    """Returns a stable hash of the options passed to an engine.
+    """
+    data = json.dumps(options, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+def hash_engine(engine):
+    """Returns a stable hash of the type and the configuration of an engine.
+    """
+    return hash_options({"engine": type(engine).__name__, "config": engine.get_config()})
+
+class MemoryCache:
+    """In-memory cache, which discards the least recently used entry when
+    it has more than maxsize entries. The cache is unbounded when maxsize
+    is None.
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+
+    def get(self, key, default=None):
+        if key not in self.data:
+            return default
+        self.data.move_to_end(key)
+        return self.data[key]
+
+    def set(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while self.maxsize is not None and len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def __len__(self):
+        return len(self.data)
+
+class DiskCache:
+    """Cache that stores every entry as a pickle file in a directory.
+
+    The cache survives restarts of the process and can be shared by many
+    processes.
+    """
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _get_path(self, key):
+        return os.path.join(self.path, key + ".pkl")
+
+    def get(self, key, default=None):
+        try:
+            with open(self._get_path(key), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return default
+
+    def set(self, key, value):
+        path = self._get_path(key)
+        # write to a temp file and rename, so that readers never see a partial file
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        return sum(1 for name in os.listdir(self.path) if name.endswith(".pkl"))
+
+class CachedEngine(BaseEngine):
+    """Engine that caches the forecasts of another engine.
+
+    The forecasts are cached by a hash of the fit dataframe, the predict
+    dataframe, the options and the configuration of the engine (see
+    BaseEngine.get_config), so calling predict again with the same inputs
+    returns the cached forecast without running the engine.
+
+    Parameters
+    ----------
+    engine:
+        The engine to compute the forecasts, either an engine or the name
+        of a registered engine. Defaults to the default engine.
+
+    cache:
+        The cache to store the forecasts in, like MemoryCache or DiskCache.
+        Defaults to a new MemoryCache.
+
+    Example
+    -------
+
+    engine = CachedEngine("local", cache=DiskCache("/tmp/forecasts"))
+    model = Prophet(engine=engine)
+    """
+    def __init__(self, engine=None, cache=None):
+        self.engine = make_engine(engine)
+        self.cache = MemoryCache() if cache is None else cache
+
+    def get_config(self):
+        return {"engine": type(self.engine).__name__, "config": self.engine.get_config()}
+
+    def cache_key(self, df_fit, df_predict, options):
+        parts = [
+            hash_engine(self.engine),
+            hash_dataframe(df_fit),
+            hash_dataframe(df_predict),
+            hash_options(options)
+        ]
+        return hashlib.sha256(":".join(parts).encode("utf-8")).hexdigest()
+
+    def forecast(self, df_fit, df_predict, options):
+        key = self.cache_key(df_fit, df_predict, options)
+        df = self.cache.get(key)
+        if df is None:
+            df = self.engine.forecast(df_fit, df_predict, options)
+            self.cache.set(key, df)
+        # don't let the caller modify the cached forecast
+        return df.copy()
+
+class IncrementalEngine(BaseEngine):
+    """Engine that forecasts only the keys whose inputs have changed since
+    the previous forecast.
+
+    A fingerprint of every key is computed from its rows in the fit
+    dataframe, its rows in the predict dataframe and the options. Only the
+    keys whose fingerprint is not in the cache are sent to the engine. The
+    cached forecasts of the other keys are combined with the new ones.
+    Engines with different configurations (see BaseEngine.get_config) don't
+    share the cached forecasts.
+
+    Parameters
+    ----------
+    engine:
+        The engine to compute the forecasts, either an engine or the name
+        of a registered engine. Defaults to the default engine.
+
+    cache:
+        The cache to store the forecast of every key in. Use a DiskCache
+        to keep the forecasts between runs. Defaults to an unbounded
+        MemoryCache.
+    """
+    def __init__(self, engine=None, cache=None):
+        self.engine = make_engine(engine)
+        self.cache = MemoryCache(maxsize=None) if cache is None else cache
+
+    def get_config(self):
+        return {"engine": type(self.engine).__name__, "config": self.engine.get_config()}
+
+    def cache_key(self, key):
+        data = "{}:{!r}".format(hash_engine(self.engine), key)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def get_fingerprints(self, df_fit, df_predict, options):
+        """Returns a dict with the fingerprint of every key in df_predict.
+        """
+        fit_hashes = hash_dataframe_by_key(df_fit)
+        predict_hashes = hash_dataframe_by_key(df_predict)
+
+        missing_keys = {k for k in predict_hashes if k not in fit_hashes}
+        if missing_keys:
+            raise ValueError("Can't forecast for a key that is not part of the dataframe given to fit")
+
+        options_hash = hash_options(options)
+        return {
+            key: hashlib.sha256(":".join([fit_hashes[key], h, options_hash]).encode("utf-8")).hexdigest()
+            for key, h in predict_hashes.items()
+        }
+
+    def forecast(self, df_fit, df_predict, options):
+        fingerprints = self.get_fingerprints(df_fit, df_predict, options)
+
+        forecasts = {}
+        changed_keys = []
+        for key, fingerprint in fingerprints.items():
+            entry = self.cache.get(self.cache_key(key))
+            if entry is not None and entry[0] == fingerprint:
+                forecasts[key] = entry[1]
+            else:
+                changed_keys.append(key)
+
+        if changed_keys:
+            df = self.engine.forecast(
+                df_fit[df_fit['key'].isin(changed_keys)],
+                df_predict[df_predict['key'].isin(changed_keys)],
+                options)
+            for key, part in df.groupby('key'):
+                self.cache.set(self.cache_key(key), (fingerprints[key], part))
+                forecasts[key] = part
+
+        return pd.concat([forecasts[key] for key in fingerprints])
+
 DEFAULT_ENDPOINT_URL = "https://api.hyperprophet.com"
 DEFAULT_API_TOKEN = None
 
@@ -125,21 +623,202 @@ def setup(api_token, endpoint_url=None):
     if endpoint_url is not None:
         DEFAULT_ENDPOINT_URL = endpoint_url
 
+class Polling:
+    """Strategy to poll the status of a job while waiting for it.
+
+    The interval between the polls starts at initial_interval and grows by
+    multiplier after every poll, up to max_interval. The interval is never
+    longer than the estimated time remaining for the job, so that short
+    jobs are picked up soon after they are complete. A random jitter is
+    added to the interval to avoid many clients polling in lockstep.
+
+    Parameters
+    ----------
+    initial_interval:
+        Seconds to wait after the first poll.
+
+    max_interval:
+        Maximum seconds to wait between two polls.
+
+    multiplier:
+        Factor by which the interval grows after every poll.
+
+    jitter:
+        Maximum random jitter, as a fraction of the interval.
+
+    timeout:
+        Maximum seconds to wait for the job to complete. Waits forever
+        when None.
+
+    long_poll:
+        When specified, the server is asked to hold every status request
+        for up to these many seconds until the status of the job changes,
+        and the client doesn't sleep between the polls.
+    """
+    def __init__(self, initial_interval=0.5, max_interval=30.0, multiplier=1.5,
+                 jitter=0.1, timeout=None, long_poll=None):
+        if initial_interval <= 0 or max_interval < initial_interval:
+            raise ValueError("Expected 0 < initial_interval <= max_interval")
+        if multiplier < 1:
+            raise ValueError("multiplier must be >= 1")
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.timeout = timeout
+        self.long_poll = long_poll
+
+    def next_interval(self, attempt, eta=None):
+        """Returns the seconds to wait after the given poll attempt.
+
+        Parameters
+        ----------
+        attempt:
+            Number of the poll, starting with 0.
+
+        eta:
+            Estimated seconds remaining for the job to complete, if known.
+        """
+        interval = min(self.max_interval, self.initial_interval * self.multiplier ** attempt)
+        if eta is not None:
+            interval = max(self.initial_interval, min(interval, eta))
+        return interval * (1 + self.jitter * random.random())
+
+    @staticmethod
+    def estimate_eta(elapsed, start_progress, progress):
+        """Estimates the seconds remaining for a job to complete from the
+        progress made in the elapsed seconds.
+
+        Returns None when no progress has been made yet.
+        """
+        if elapsed <= 0 or progress <= start_progress:
+            return None
+        rate = (progress - start_progress) / elapsed
+        return max(0.0, (1.0 - progress) / rate)
+
+def log_job_status(job):
+    """The default callback to report the status of a job while waiting.
+    """
+    eta = "-" if job.eta is None else "{:.0f}s".format(job.eta)
+    logger.info("[JOB %s] status=%s progress=%s eta=%s", job.id, job.status, job.progress, eta)
+
 class HyperprophetEngine(BaseEngine):
     """Engine to run forecast on the hyperprophet cloud.
+
+    Parameters
+    ----------
+    api_token:
+        API token to access the hyperprophet service. Defaults to the one
+        specified using the setup function.
+
+    endpoint_url:
+        Optional endpoint URL to specify when working against a different server.
+
+    polling:
+        The Polling strategy used while waiting for jobs to complete.
+
+    pool_size:
+        Maximum number of connections kept alive per host. Increase this
+        when many jobs are in flight from the same process.
+
+    max_retries:
+        Number of times idempotent requests (GET, PUT etc.) are retried on
+        connection errors and on 429/5xx responses.
+
+    backoff_factor:
+        The retries wait backoff_factor * 2 ** (retry - 1) seconds.
+
+    shard_rows:
+        When specified, the keys are split into shards of at most these
+        many rows of the fit dataframe and every shard is submitted as a
+        separate job. A key is never split across shards.
+
+    shard_bytes:
+        Like shard_rows, but limits the approximate size of the fit
+        dataframe of each shard in bytes.
+
+    max_shard_jobs:
+        Maximum number of shard jobs running in parallel.
+
+    shard_retries:
+        Number of times a failed shard job is resubmitted, independently
+        of the other shards.
+
+    journal:
+        A JobJournal, or the path of one, to record the submitted jobs in.
+        Jobs that were submitted but whose results were never read, say
+        because the process crashed, can be resumed using resume.
+
+    chunked_upload:
+        Whether the payload of a job is streamed to the upload URL with
+        chunked transfer encoding, as it is serialized. Some upload URLs,
+        like presigned object store URLs, need the length of the body in
+        advance. With False, the payload is first written to a temporary
+        buffer, in memory or on disk when large, and uploaded with a
+        Content-Length.
+
+    The engine keeps its HTTP connections alive between requests. Call
+    close, or use the engine as a context manager, to release them.
     """
-    def __init__(self, api_token=None, endpoint_url=None):
+    RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+    def __init__(self, api_token=None, endpoint_url=None, polling=None,
+                 pool_size=10, max_retries=3, backoff_factor=0.5,
+                 shard_rows=None, shard_bytes=None, max_shard_jobs=4, shard_retries=2,
+                 journal=None, chunked_upload=True):
         self.api_token = api_token or DEFAULT_ENDPOINT_URL
         if self.api_token is None:
             raise ValueError("Please provide api_token. You can also call the setup function to set it globally.")
 
         self.endpoint_url = endpoint_url or DEFAULT_ENDPOINT_URL
         self.endpoint_url = self.endpoint_url.rstrip("/")
+        self.polling = polling or Polling()
+        self.pool_size = pool_size
+        self.session = self._make_session(pool_size, max_retries, backoff_factor)
+        self.shard_rows = shard_rows
+        self.shard_bytes = shard_bytes
+        self.max_shard_jobs = max_shard_jobs
+        self.shard_retries = shard_retries
+        if isinstance(journal, (str, os.PathLike)):
+            journal = JobJournal(journal)
+        self.journal = journal
+        self.chunked_upload = chunked_upload
+
+    def get_config(self):
+        return {"endpoint_url": self.endpoint_url}
+
+    def _make_session(self, pool_size, max_retries, backoff_factor):
+        # Retry only the methods that are safe to repeat, which is the
+        # default of Retry. POST requests like /jobs.create are not retried.
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            raise_on_status=False)
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def close(self):
+        """Closes the HTTP connections kept alive by the engine.
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def request(self, method, path, json=None, **kwargs):
         headers = {"Authorization": "Bearer " + self.api_token}
         url = self.endpoint_url + path
-        return requests.request(
+        return self.session.request(
             method=method,
             url=url,
             headers=headers,
@@ -147,13 +826,123 @@ class HyperprophetEngine(BaseEngine):
             **kwargs)
 
     def forecast(self, df_fit, df_predict, options):
+        shards = self.get_shards(df_fit, df_predict)
+        if len(shards) <= 1:
+            job = self.run_job(df_fit, df_predict, options)
+            return self._read_results(job)
+        return pd.concat(self._forecast_shards(shards, df_fit, df_predict, options))
+
+    def forecast_iter(self, df_fit, df_predict, options):
+        shards = self.get_shards(df_fit, df_predict)
+        if len(shards) <= 1:
+            job = self.run_job(df_fit, df_predict, options)
+            yield from job.iter_results()
+            self._journal("completed", job)
+        else:
+            for df in self._forecast_shards(shards, df_fit, df_predict, options):
+                yield from df.groupby('key')
+
+    def get_shards(self, df_fit, df_predict):
+        """Splits the keys of df_predict into shards, as specified by
+        shard_rows and shard_bytes.
+
+        Returns a list of lists of keys, in the sorted order of the keys.
+        """
+        keys = sorted(df_predict['key'].unique())
+        if self.shard_rows is None and self.shard_bytes is None:
+            return [keys]
+
+        rows = df_fit.groupby('key').size().reindex(keys, fill_value=0)
+        limits = []
+        if self.shard_rows is not None:
+            limits.append((rows.values, self.shard_rows))
+        if self.shard_bytes is not None:
+            row_size = df_fit.memory_usage(deep=True, index=False).sum() / max(len(df_fit), 1)
+            limits.append((rows.values * row_size, self.shard_bytes))
+
+        shards = [[]]
+        totals = [0] * len(limits)
+        for i, key in enumerate(keys):
+            sizes = [values[i] for values, _ in limits]
+            full = any(total + size > limit for total, size, (_, limit) in zip(totals, sizes, limits))
+            if full and shards[-1]:
+                shards.append([])
+                totals = [0] * len(limits)
+            shards[-1].append(key)
+            totals = [total + size for total, size in zip(totals, sizes)]
+        return shards
+
+    def _forecast_shards(self, shards, df_fit, df_predict, options):
+        """Forecasts every shard as a separate job, running up to
+        max_shard_jobs jobs in parallel.
+
+        Returns an iterator over the forecasts of the shards, in order.
+        """
+        def forecast_shard(keys):
+            return self._forecast_shard(
+                df_fit[df_fit['key'].isin(keys)],
+                df_predict[df_predict['key'].isin(keys)],
+                options)
+
+        with ThreadPoolExecutor(max_workers=self.max_shard_jobs) as executor:
+            yield from executor.map(forecast_shard, shards)
+
+    def _forecast_shard(self, df_fit, df_predict, options):
+        for attempt in range(self.shard_retries + 1):
+            try:
+                job = self.run_job(df_fit, df_predict, options)
+                return self._read_results(job)
+            except (EngineError, requests.RequestException) as e:
+                if attempt == self.shard_retries:
+                    raise
+                logger.warning("Forecast of a shard failed, retrying. (%s)", e)
+
+    def run_job(self, df_fit, df_predict, options):
+        """Runs a forecast job and waits for it to complete.
+
+        Returns the completed job, to read the results from.
+        """
         job = Job.create(self, options)
         job.upload_files(df_fit, df_predict)
         job.start()
+        self._journal("submitted", job)
+        self._wait(job)
+        return job
+
+    def _wait(self, job):
         job.wait()
-        return job.read_results_df()
+        if job.status != 'SUCCESS':
+            self._journal("completed", job)
+            raise EngineError("Job {} did not succeed. (status={})".format(job.id, job.status))
+
+    def _read_results(self, job):
+        df = job.read_results_df()
+        self._journal("completed", job)
+        return df
+
+    def _journal(self, event, job):
+        if self.journal is not None:
+            self.journal.record(event, job)
+
+    def get_job(self, job_id):
+        """Returns the job with the given id.
+        """
+        return Job.attach(self, job_id)
+
+    def resume(self, job_id):
+        """Resumes a job submitted earlier, possibly by another process, and
+        returns its forecast.
+
+        The job is waited for if it is still running. The ids of the jobs
+        to resume can be found using journal.pending().
+        """
+        job = self.get_job(job_id)
+        self._wait(job)
+        return self._read_results(job)
 
 class Job:
+    FINAL_STATUSES = ['SUCCESS', 'FAILED', 'ABORTED']
+
     def __init__(self, engine, id, status, data_upload_url=None, results_url=None, progress=0.0):
         self.engine = engine
         self.id = id
@@ -161,6 +950,7 @@ class Job:
         self.data_upload_url = data_upload_url
         self.results_url = results_url
         self.progress = progress
+        self.eta = None
 
     def start(self):
         """Starts the job execution.
@@ -186,59 +976,124 @@ class Job:
         """
         self.status = data['status']
         self.progress = data['progress']
+        self.data_upload_url = data.get('data_upload_url', self.data_upload_url)
 
-    def _refresh(self):
-        response = self.engine.request("GET", "/jobs.info", params={"id": self.id})
+    def _refresh(self, long_poll=None):
+        params = {"id": self.id}
+        kwargs = {}
+        if long_poll:
+            params["wait"] = long_poll
+            kwargs["timeout"] = long_poll + 30
+        response = self.engine.request("GET", "/jobs.info", params=params, **kwargs)
         d = response.json()
         if d['ok'] is False:
             raise EngineError("Failed to get jon status. ({})".format(d['error']))
         self._update(d['job'])
 
-    def read_results_df(self):
+    def _get_download_url(self):
         response = self.engine.request("GET", "/jobs.result", params={"id": self.id})
         if response.status_code != 200:
             raise EngineError("Failed to read the results. ({} - {})".format(response.status_code, response.text[:100]))
         d = response.json()
         if d['ok'] is False:
             raise EngineError("Failed to read the results. ({})".format(d['error']))
+        return d['download_url']
 
-        with tempfile.TemporaryDirectory() as tmp:
-            path = os.path.join(tmp, "data.parq")
-            self._download(d['download_url'], path)
-            return pd.read_parquet(path)
+    def read_results_df(self):
+        """Reads the results of the job as a pandas dataframe.
+        """
+        return self.read_results_table().to_pandas()
 
-    def _download(self, url, path):
-        response = requests.get(url)
-        response.raise_for_status()
-        with open(path, 'wb') as f:
-            CHUNK_SIZE = 1024*1024 # 1MB
-            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
-                f.write(chunk)
+    def read_results_table(self):
+        """Reads the results of the job as a pyarrow Table.
 
-    def upload_files(self, df_train, df_predict):
-        """Uploads the required files to the job.
+        The results are downloaded into memory and decoded from there,
+        without going through a temporary file.
+        """
+        buf = pa.BufferOutputStream()
+        self.download_results(buf)
+        return pq.read_table(pa.BufferReader(buf.getvalue()))
+
+    def open_results(self):
+        """Opens the results of the job lazily as a pyarrow ParquetFile.
+
+        Only the metadata is read when the file is opened. The row groups
+        are fetched from the server, using HTTP range requests, only when
+        they are read.
+        """
+        return pq.ParquetFile(RemoteFile(self.engine.session, self._get_download_url()))
+
+    def iter_results_batches(self, batch_size=65536):
+        """Yields the results of the job as pyarrow RecordBatches, reading
+        one row group at a time.
         """
-        with tempfile.TemporaryDirectory() as tmp:
-            train_path = os.path.join(tmp, "train.parq")
-            df_train.to_parquet(train_path)
+        yield from self.open_results().iter_batches(batch_size=batch_size)
+
+    def iter_results(self):
+        """Yields a tuple (key, df) for each key in the results of the job,
+        reading one row group at a time.
 
-            predict_path = os.path.join(tmp, "predict.parq")
-            df_predict.to_parquet(predict_path)
+        The rows of every key must be contiguous in the results, as written
+        by the server.
+        """
+        seen = set()
+        key, parts = None, []
+        for batch in self.iter_results_batches():
+            if batch.num_rows == 0:
+                continue
+            df = batch.to_pandas()
+            keys = df['key'].values
+            starts = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+            for start, end in zip(np.r_[0, starts], np.r_[starts, len(df)]):
+                part = df.iloc[start:end]
+                if part['key'].iat[0] != key:
+                    if parts:
+                        yield key, pd.concat(parts)
+                    key, parts = part['key'].iat[0], []
+                    if key in seen:
+                        raise EngineError("The rows of key {!r} are not contiguous in the results.".format(key))
+                    seen.add(key)
+                parts.append(part)
+        if parts:
+            yield key, pd.concat(parts)
 
-            zip_path = os.path.join(tmp, "payload.zip")
-            with zipfile.ZipFile(zip_path, "w") as z:
-                z.write(train_path, "train.parq")
-                z.write(predict_path, "predict.parq")
+    def download_results(self, dest):
+        """Downloads the results of the job, in parquet format, to dest.
 
-            headers = {
-                "content-type": "application/zip"
-            }
-            response = requests.put(
-                self.data_upload_url,
-                data=open(zip_path, 'rb'),
-                headers=headers)
-            if response.status_code != 200:
-                raise EngineError("Failed to upload the job payload. ({} - {})".format(response.status_code, response.text[:100]))
+        dest can be a path or a writable file-like object.
+        """
+        response = self.engine.session.get(self._get_download_url(), stream=True)
+        response.raise_for_status()
+        CHUNK_SIZE = 1024*1024 # 1MB
+        with response:
+            if isinstance(dest, (str, os.PathLike)):
+                with open(dest, 'wb') as f:
+                    self._copy_chunks(response, f, CHUNK_SIZE)
+            else:
+                self._copy_chunks(response, dest, CHUNK_SIZE)
+
+    def _copy_chunks(self, response, f, chunk_size):
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            f.write(chunk)
+
+    def upload_files(self, df_train, df_predict):
+        """Uploads the required files to the job.
+
+        The payload is streamed to the server as it is serialized, without
+        writing any temporary files, unless the chunked_upload option of the
+        engine is False.
+        """
+        headers = {
+            "content-type": "application/zip"
+        }
+        payload = UploadPayload(df_train, df_predict)
+        if self.engine.chunked_upload:
+            response = self.engine.session.put(self.data_upload_url, data=payload, headers=headers)
+        else:
+            with payload.spool() as f:
+                response = self.engine.session.put(self.data_upload_url, data=f, headers=headers)
+        if response.status_code != 200:
+            raise EngineError("Failed to upload the job payload. ({} - {})".format(response.status_code, response.text[:100]))
 
     @classmethod
     def create(cls, engine, options):
@@ -256,22 +1111,439 @@ class Job:
 
         job = d['job']
 
-        return Job(
+        return cls(
             engine=engine,
             id=job['id'],
             status=job['status'],
             data_upload_url=job['data_upload_url'])
 
-    def wait(self):
-        while self.status not in ['SUCCESS', 'FAILED', 'ABORTED']:
-            self._refresh()
-            print("[JOB {}] status={} progress={}".format(self.id, self.status, self.progress))
-            time.sleep(5)
+    @classmethod
+    def attach(cls, engine, job_id):
+        """Returns an existing job, given its id.
+
+        This allows waiting for a job and reading its results from a
+        process other than the one that created it.
+        """
+        job = cls(engine=engine, id=job_id, status=None)
+        job._refresh()
+        return job
+
+    def wait(self, polling=None, callback=log_job_status):
+        """Waits for the job to complete.
+
+        Parameters
+        ----------
+        polling:
+            The Polling strategy to use. Defaults to the one of the engine.
+
+        callback:
+            Function called with the job after every poll. Logs the status
+            of the job by default.
+        """
+        polling = polling or self.engine.polling
+        started, start_progress = time.monotonic(), self.progress
+        for attempt in itertools.count():
+            if self.status in self.FINAL_STATUSES:
+                return
+            self._refresh(long_poll=polling.long_poll)
+            delay = self._next_poll(polling, callback, started, start_progress, attempt)
+            if delay:
+                time.sleep(delay)
+
+    def _next_poll(self, polling, callback, started, start_progress, attempt):
+        """Updates the eta of the job after a poll and returns the seconds
+        to sleep before the next poll.
+        """
+        elapsed = time.monotonic() - started
+        self.eta = polling.estimate_eta(elapsed, start_progress, self.progress)
+        if callback:
+            callback(self)
+
+        if self.status in self.FINAL_STATUSES or polling.long_poll:
+            delay = 0
+        else:
+            delay = polling.next_interval(attempt, self.eta)
+
+        if polling.timeout is not None and self.status not in self.FINAL_STATUSES:
+            remaining = polling.timeout - elapsed
+            if remaining <= 0:
+                raise EngineError("Timed out waiting for job {} to complete.".format(self.id))
+            delay = min(delay, remaining)
+        return delay
+
+class JobJournal:
+    """Local journal of the jobs submitted by HyperprophetEngine.
+
+    Every job is recorded when it is submitted and again when its results
+    are read, as a line of JSON in the journal file. The jobs submitted
+    but not completed, for example when the process crashed while waiting
+    for them, can be resumed after a restart:
+
+        engine = HyperprophetEngine(journal="jobs.jsonl")
+        for job_id in engine.journal.pending():
+            forecast = engine.resume(job_id)
+    """
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+        self.lock = threading.Lock()
+        dirname = os.path.dirname(self.path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+    def record(self, event, job):
+        entry = {
+            "event": event,
+            "id": job.id,
+            "status": job.status,
+            "time": time.time()
+        }
+        with self.lock, open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def entries(self):
+        """Returns all the entries in the journal.
+        """
+        if not os.path.exists(self.path):
+            return []
+        with self.lock, open(self.path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def pending(self):
+        """Returns the ids of the jobs that were submitted, but not
+        completed, in the order they were submitted.
+        """
+        pending = OrderedDict()
+        for entry in self.entries():
+            if entry["event"] == "submitted":
+                pending[entry["id"]] = entry
+            elif entry["event"] == "completed":
+                pending.pop(entry["id"], None)
+        return list(pending)
+
+class UploadPayload:
+    """The payload of a job, as an iterable of bytes to stream in the
+    request body.
+
+    The payload is a zip file with the training and the prediction
+    dataframes as train.parq and predict.parq. The dataframes are written
+    row_group_size rows at a time, so the memory used is bounded by the
+    size of a row group irrespective of the size of the dataframes. As
+    parquet is already compressed, the zip entries are stored as is.
+
+    Every iteration serializes the payload afresh, which allows the
+    request to be retried.
+    """
+    ROW_GROUP_SIZE = 100000
+    SPOOL_MAX_SIZE = 64*1024*1024 # 64MB
+
+    def __init__(self, df_train, df_predict, row_group_size=ROW_GROUP_SIZE):
+        self.files = [
+            ("train.parq", df_train),
+            ("predict.parq", df_predict)
+        ]
+        self.row_group_size = row_group_size
+
+    def __iter__(self):
+        buffer = _ChunkBuffer()
+        with zipfile.ZipFile(buffer, "w") as z:
+            for name, df in self.files:
+                with z.open(name, "w", force_zip64=True) as f:
+                    for _ in self._write_parquet(df, f):
+                        yield from buffer.drain()
+        yield from buffer.drain()
+
+    def spool(self, max_size=SPOOL_MAX_SIZE):
+        """Writes the payload to a temporary file, to upload it with a known
+        length.
+
+        The payload is kept in memory up to max_size bytes, and moved to a
+        file on disk when it grows larger. Returns the file, positioned at
+        the start, which the caller must close.
+        """
+        f = io.BytesIO()
+        for chunk in self:
+            if isinstance(f, io.BytesIO) and f.tell() + len(chunk) > max_size:
+                disk = tempfile.TemporaryFile()
+                disk.write(f.getbuffer())
+                f = disk
+            f.write(chunk)
+        f.seek(0)
+        return f
+
+    def _write_parquet(self, df, f):
+        """Writes the dataframe to f in parquet format, yielding after
+        every row group.
+        """
+        schema = pa.Schema.from_pandas(df)
+        with pq.ParquetWriter(f, schema) as writer:
+            # an empty dataframe still gets a row group, to keep its schema
+            for start in range(0, max(len(df), 1), self.row_group_size):
+                part = df.iloc[start:start+self.row_group_size]
+                writer.write_table(pa.Table.from_pandas(part, schema=schema))
+                yield
+
+class RemoteFile(io.RawIOBase):
+    """Read-only, seekable file-like object over HTTP.
+
+    The file is read using HTTP range requests. The reads are done in
+    blocks of block_size bytes, so that many small reads, like those made
+    to read parquet metadata, need only a few requests.
+    """
+    BLOCK_SIZE = 8*1024*1024 # 8MB
+
+    def __init__(self, session, url, block_size=BLOCK_SIZE):
+        self.session = session
+        self.url = url
+        self.block_size = block_size
+        self.pos = 0
+        self.size = None
+        self.block_start = 0
+        self.block = b''
+        # Parquet readers start from the footer, so fetch the last block
+        # first, which also gives the size of the file.
+        self._fetch_block(-block_size)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.pos = offset
+        elif whence == io.SEEK_CUR:
+            self.pos += offset
+        elif whence == io.SEEK_END:
+            self.pos = self.size + offset
+        else:
+            raise ValueError("Invalid whence: {!r}".format(whence))
+        return self.pos
+
+    def readinto(self, b):
+        n = min(len(b), max(0, self.size - self.pos))
+        done = 0
+        while done < n:
+            offset = self.pos - self.block_start
+            if not 0 <= offset < len(self.block):
+                self._fetch_block(self.pos, n - done)
+                offset = 0
+            chunk = self.block[offset:offset + n - done]
+            b[done:done+len(chunk)] = chunk
+            done += len(chunk)
+            self.pos += len(chunk)
+        return n
+
+    def _fetch_block(self, start, size=0):
+        """Fetches the block starting at start. A negative start fetches the
+        last -start bytes of the file.
+        """
+        if start < 0:
+            byte_range = "bytes={}".format(start)
+        else:
+            end = start + max(size, self.block_size) - 1
+            byte_range = "bytes={}-{}".format(start, end)
+
+        response = self.session.get(self.url, headers={"Range": byte_range})
+        response.raise_for_status()
+        if response.status_code == 206:
+            # Content-Range: bytes <start>-<end>/<size>
+            content_range = response.headers["Content-Range"]
+            self.block_start = int(content_range.split(" ")[1].split("-")[0])
+            self.size = int(content_range.split("/")[1])
+        else:
+            # The server doesn't support range requests and sent everything
+            self.block_start = 0
+            self.size = len(response.content)
+        self.block = response.content
+
+class _ChunkBuffer:
+    """Write-only file-like object that collects the chunks written to it
+    until they are drained.
+    """
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+class AsyncHyperprophetEngine(HyperprophetEngine):
+    """Engine to run forecast on the hyperprophet cloud using asyncio.
+
+    The forecast method of this engine is a coroutine, so that a single
+    process can submit and track many jobs concurrently.
+
+        engine = AsyncHyperprophetEngine()
+        forecasts = await asyncio.gather(*[
+            engine.forecast(df_fit, df_predict, options)
+            for df_fit, df_predict in inputs
+        ])
+
+    When used with Prophet, predict returns an awaitable and predict_iter
+    returns an async iterator.
+
+    The HTTP calls are made on a pool of threads, whose size can be
+    specified using max_workers. It defaults to pool_size, so that every
+    thread can keep its connection alive.
+
+    The other parameters are those of HyperprophetEngine. The shards of a
+    forecast run as concurrent tasks, and get_job and resume are
+    coroutines.
+    """
+    def __init__(self, api_token=None, endpoint_url=None, polling=None,
+                 pool_size=10, max_retries=3, backoff_factor=0.5, max_workers=None,
+                 shard_rows=None, shard_bytes=None, max_shard_jobs=4, shard_retries=2,
+                 journal=None, chunked_upload=True):
+        super().__init__(
+            api_token=api_token,
+            endpoint_url=endpoint_url,
+            polling=polling,
+            pool_size=pool_size,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            shard_rows=shard_rows,
+            shard_bytes=shard_bytes,
+            max_shard_jobs=max_shard_jobs,
+            shard_retries=shard_retries,
+            journal=journal,
+            chunked_upload=chunked_upload)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or pool_size)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        super().close()
+
+    async def run_sync(self, func, *args, **kwargs):
+        """Runs a blocking function on the thread pool of this engine.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def forecast(self, df_fit, df_predict, options):
+        shards = self.get_shards(df_fit, df_predict)
+        if len(shards) <= 1:
+            job = await self.run_job(df_fit, df_predict, options)
+            return await self._read_results(job)
+        return pd.concat(await self._forecast_shards(shards, df_fit, df_predict, options))
+
+    async def forecast_iter(self, df_fit, df_predict, options):
+        df = await self.forecast(df_fit, df_predict, options)
+        for key, part in df.groupby('key'):
+            yield key, part
+
+    async def _forecast_shards(self, shards, df_fit, df_predict, options):
+        """Forecasts every shard as a separate job, running up to
+        max_shard_jobs jobs concurrently.
+
+        Returns the list of the forecasts of the shards, in order.
+        """
+        semaphore = asyncio.Semaphore(self.max_shard_jobs)
+
+        async def forecast_shard(keys):
+            async with semaphore:
+                return await self._forecast_shard(
+                    df_fit[df_fit['key'].isin(keys)],
+                    df_predict[df_predict['key'].isin(keys)],
+                    options)
+
+        return await asyncio.gather(*[forecast_shard(keys) for keys in shards])
+
+    async def _forecast_shard(self, df_fit, df_predict, options):
+        for attempt in range(self.shard_retries + 1):
+            try:
+                job = await self.run_job(df_fit, df_predict, options)
+                return await self._read_results(job)
+            except (EngineError, requests.RequestException) as e:
+                if attempt == self.shard_retries:
+                    raise
+                logger.warning("Forecast of a shard failed, retrying. (%s)", e)
+
+    async def run_job(self, df_fit, df_predict, options):
+        """Runs a forecast job and waits for it to complete.
+
+        Returns the completed job, to read the results from.
+        """
+        job = await AsyncJob.create(self, options)
+        await job.upload_files(df_fit, df_predict)
+        await job.start()
+        await self.run_sync(self._journal, "submitted", job)
+        await self._wait(job)
+        return job
+
+    async def _wait(self, job):
+        await job.wait()
+        if job.status != 'SUCCESS':
+            await self.run_sync(self._journal, "completed", job)
+            raise EngineError("Job {} did not succeed. (status={})".format(job.id, job.status))
+
+    async def _read_results(self, job):
+        df = await job.read_results_df()
+        await self.run_sync(self._journal, "completed", job)
+        return df
+
+    async def get_job(self, job_id):
+        """Returns the job with the given id.
+        """
+        return await AsyncJob.attach(self, job_id)
+
+    async def resume(self, job_id):
+        """Resumes a job submitted earlier, possibly by another process, and
+        returns its forecast.
+        """
+        job = await self.get_job(job_id)
+        await self._wait(job)
+        return await self._read_results(job)
+
+class AsyncJob(Job):
+    """Job with coroutine methods, used by AsyncHyperprophetEngine.
+    """
+    @classmethod
+    async def create(cls, engine, options):
+        return await engine.run_sync(super().create, engine, options)
+
+    @classmethod
+    async def attach(cls, engine, job_id):
+        return await engine.run_sync(super().attach, engine, job_id)
+
+    async def start(self):
+        await self.engine.run_sync(super().start)
+
+    async def upload_files(self, df_train, df_predict):
+        await self.engine.run_sync(super().upload_files, df_train, df_predict)
+
+    async def read_results_df(self):
+        return await self.engine.run_sync(super().read_results_df)
+
+    async def wait(self, polling=None, callback=log_job_status):
+        polling = polling or self.engine.polling
+        started, start_progress = time.monotonic(), self.progress
+        for attempt in itertools.count():
+            if self.status in self.FINAL_STATUSES:
+                return
+            await self.engine.run_sync(self._refresh, long_poll=polling.long_poll)
+            delay = self._next_poll(polling, callback, started, start_progress, attempt)
+            if delay:
+                await asyncio.sleep(delay)
 
 class EngineError(Exception):
     pass
 
 register_engine('zero', ZeroEngine)
 register_engine('local', LocalEngine)
+register_engine('parallel', ParallelLocalEngine)
 register_engine('remote', HyperprophetEngine)
+register_engine('remote-async', AsyncHyperprophetEngine)
 register_engine('default', HyperprophetEngine)
\ No newline at end of file
@@ -6,21 +6,47 @@
 
 from __future__ import absolute_import, division, print_function
 
+import hashlib
 import logging
-from collections import OrderedDict, defaultdict
+import threading
+from collections import OrderedDict
 from copy import deepcopy
-from datetime import timedelta, datetime
 
 import numpy as np
 import pandas as pd
+from pandas.api.types import is_numeric_dtype
 
 from .make_holidays import get_holiday_names, make_holidays_df
 from .models import StanBackendEnum
 from .plot import (plot, plot_components)
+from .utilities import fourier_components, spawn_seed, warm_start_params
 
 logger = logging.getLogger('fbprophet')
 logger.setLevel(logging.INFO)
 
+# Maximum size, in bytes, of the Fourier series kept by Prophet.fourier_series
+# for the dates seen last. The models of many keys with the same dates share
+# the same series.
+FOURIER_CACHE_MAX_BYTES = 256 * 2 ** 20
+_fourier_cache = OrderedDict()
+_fourier_lock = threading.Lock()
+
+
+def _set_column(df, name, values):
+    """Sets the column name of df to values.
+
+    An existing column is deleted and inserted again at the same position,
+    rather than assigned. On pandas < 1.5, assigning to an existing column
+    writes into its data in place, which df shares with the dataframe it is
+    a shallow copy of.
+    """
+    if name in df:
+        loc = df.columns.get_loc(name)
+        del df[name]
+        df.insert(loc, name, values)
+    else:
+        df[name] = values
+
 
 class Prophet(object):
     """Prophet forecaster.
@@ -74,6 +100,12 @@ class Prophet(object):
         uncertainty intervals.
     stan_backend: str as defined in StanBackendEnum default: None - will try to
         iterate over all available backends and find the working one
+    seed: Seed of the random numbers used to simulate the uncertainty
+        intervals, an int or a np.random.SeedSequence. A np.random.Generator
+        is used to draw an int seed once. The predictions of a model with a
+        seed are reproducible, the blocks of rows (see predict_uncertainty)
+        each have their own independent stream. Defaults to None, which uses
+        the global state of np.random.
     """
 
     def __init__(
@@ -93,7 +125,8 @@ class Prophet(object):
             mcmc_samples=0,
             interval_width=0.80,
             uncertainty_samples=1000,
-            stan_backend=None
+            stan_backend=None,
+            seed=None
     ):
         self.growth = growth
 
@@ -119,6 +152,9 @@ class Prophet(object):
         self.mcmc_samples = mcmc_samples
         self.interval_width = interval_width
         self.uncertainty_samples = uncertainty_samples
+        if isinstance(seed, np.random.Generator):
+            seed = int(seed.integers(2 ** 63))
+        self.seed = seed
 
         # Set during fitting or by other methods
         self.start = None
@@ -134,11 +170,19 @@ class Prophet(object):
         self.history = None
         self.history_dates = None
         self.train_component_cols = None
+        self.train_feature_names = None
         self.component_modes = None
         self.train_holiday_names = None
         self.fit_kwargs = {}
         self.validate_inputs()
         self._load_stan_backend(stan_backend)
+        # Subclasses may not load a backend, like the Prophet of hyperprophet
+        backend = getattr(self, 'stan_backend', None)
+        if (self.mcmc_samples > 0 and backend is not None
+                and backend.get_type() == StanBackendEnum.NUMPY.name):
+            raise ValueError(
+                'mcmc_samples > 0 needs the PYSTAN or CMDSTANPY backend, the '
+                'NUMPY backend only computes the MAP estimate.')
 
     def _load_stan_backend(self, stan_backend):
         if stan_backend is None:
@@ -243,6 +287,12 @@ class Prophet(object):
         'y_scaled', and 'cap_scaled'. These columns are used during both
         fitting and predicting.
 
+        The columns that change are replaced in df, never modified in place
+        (see _set_column), so a shallow copy is enough to keep the input
+        unchanged. Columns that
+        already have the right type, and rows already sorted by date, are
+        left as they are.
+
         Parameters
         ----------
         df: pd.DataFrame with columns ds, y, and cap if logistic growth. Any
@@ -253,13 +303,17 @@ class Prophet(object):
         -------
         pd.DataFrame prepared for fitting or predicting.
         """
+        # The columns are only converted when they don't have the right type
+        # already, every conversion copies the column.
         if 'y' in df:  # 'y' will be in training data
-            df['y'] = pd.to_numeric(df['y'])
+            if not is_numeric_dtype(df['y']):
+                _set_column(df, 'y', pd.to_numeric(df['y']))
             if np.isinf(df['y'].values).any():
                 raise ValueError('Found infinity in column y.')
-        if df['ds'].dtype == np.int64:
-            df['ds'] = df['ds'].astype(str)
-        df['ds'] = pd.to_datetime(df['ds'])
+        if df['ds'].dtype != 'datetime64[ns]':
+            if df['ds'].dtype == np.int64:
+                _set_column(df, 'ds', df['ds'].astype(str))
+            _set_column(df, 'ds', pd.to_datetime(df['ds']))
         if df['ds'].dt.tz is not None:
             raise ValueError(
                 'Column ds has timezone specified, which is not supported. '
@@ -273,7 +327,8 @@ class Prophet(object):
                     'Regressor {name!r} missing from dataframe'
                     .format(name=name)
                 )
-            df[name] = pd.to_numeric(df[name])
+            if not is_numeric_dtype(df[name]):
+                _set_column(df, name, pd.to_numeric(df[name]))
             if df[name].isnull().any():
                 raise ValueError(
                     'Found NaN in column {name!r}'.format(name=name)
@@ -286,43 +341,53 @@ class Prophet(object):
                         'Condition {condition_name!r} missing from dataframe'
                         .format(condition_name=condition_name)
                     )
+                if df[condition_name].dtype == bool:
+                    continue
                 if not df[condition_name].isin([True, False]).all():
                     raise ValueError(
                         'Found non-boolean in column {condition_name!r}'
                         .format(condition_name=condition_name)
                     )
-                df[condition_name] = df[condition_name].astype('bool')
+                _set_column(df, condition_name, df[condition_name].astype('bool'))
 
-        if df.index.name == 'ds':
-            df.index.name = None
-        df = df.sort_values('ds')
-        df = df.reset_index(drop=True)
+        # A new index doesn't copy the data, unlike reset_index. The rows are
+        # only reordered when they are not sorted by date already.
+        df.index = pd.RangeIndex(df.shape[0])
+        if not df['ds'].is_monotonic_increasing:
+            df = df.take(np.argsort(df['ds'].values, kind='stable'))
+            df.index = pd.RangeIndex(df.shape[0])
 
         self.initialize_scales(initialize_scales, df)
 
         if self.logistic_floor:
             if 'floor' not in df:
                 raise ValueError('Expected column "floor".')
+            floor = np.asarray(df['floor'])
         else:
-            df['floor'] = 0
+            _set_column(df, 'floor', 0)
+            floor = 0
         if self.growth == 'logistic':
             if 'cap' not in df:
                 raise ValueError(
                     'Capacities must be supplied for logistic growth in '
                     'column "cap"'
                 )
-            if (df['cap'] <= df['floor']).any():
+            cap = np.asarray(df['cap'])
+            if (cap <= floor).any():
                 raise ValueError(
                     'cap must be greater than floor (which defaults to 0).'
                 )
-            df['cap_scaled'] = (df['cap'] - df['floor']) / self.y_scale
+            _set_column(df, 'cap_scaled', (cap - floor) / self.y_scale)
 
-        df['t'] = (df['ds'] - self.start) / self.t_scale
+        _set_column(df, 't', (
+            (df['ds'].values - self.start.to_datetime64()).astype(np.int64)
+            / float(self.t_scale.value)
+        ))
         if 'y' in df:
-            df['y_scaled'] = (df['y'] - df['floor']) / self.y_scale
+            _set_column(df, 'y_scaled', (df['y'].values - floor) / self.y_scale)
 
         for name, props in self.extra_regressors.items():
-            df[name] = ((df[name] - props['mu']) / props['std'])
+            _set_column(df, name, (df[name].values - props['mu']) / props['std'])
         return df
 
     def initialize_scales(self, initialize_scales, df):
@@ -417,6 +482,10 @@ class Prophet(object):
         """Provides Fourier series components with the specified frequency
         and order.
 
+        The components are cached by dates, period and order, and shared by
+        all the models, see FOURIER_CACHE_MAX_BYTES. The returned matrix is
+        read-only.
+
         Parameters
         ----------
         dates: pd.Series containing timestamps.
@@ -427,17 +496,27 @@ class Prophet(object):
         -------
         Matrix with seasonality features.
         """
+        ns = np.asarray(dates, dtype='datetime64[ns]').view(np.int64)
+        key = (hashlib.sha1(ns.tobytes()).hexdigest(), len(ns),
+               float(period), int(series_order))
+        with _fourier_lock:
+            features = _fourier_cache.get(key)
+            if features is not None:
+                _fourier_cache.move_to_end(key)
+                return features
+
         # convert to days since epoch
-        t = np.array(
-            (dates - datetime(1970, 1, 1))
-                .dt.total_seconds()
-                .astype(np.float)
-        ) / (3600 * 24.)
-        return np.column_stack([
-            fun((2.0 * (i + 1) * np.pi * t / period))
-            for i in range(series_order)
-            for fun in (np.sin, np.cos)
-        ])
+        t = 1e-9 * ns / (3600 * 24.)
+        features = fourier_components(t, period, series_order)
+        features.flags.writeable = False
+        if features.nbytes <= FOURIER_CACHE_MAX_BYTES:
+            with _fourier_lock:
+                _fourier_cache[key] = features
+                cache_bytes = sum(f.nbytes for f in _fourier_cache.values())
+                while cache_bytes > FOURIER_CACHE_MAX_BYTES:
+                    _key, evicted = _fourier_cache.popitem(last=False)
+                    cache_bytes -= evicted.nbytes
+        return features
 
     @classmethod
     def make_seasonality_features(cls, dates, period, series_order, prefix):
@@ -481,7 +560,7 @@ class Prophet(object):
         if self.holidays is not None:
             all_holidays = self.holidays.copy()
         if self.country_holidays is not None:
-            year_list = list({x.year for x in dates})
+            year_list = pd.DatetimeIndex(dates).year.unique()
             country_holidays_df = make_holidays_df(
                 year_list=year_list, country=self.country_holidays
             )
@@ -524,52 +603,9 @@ class Prophet(object):
         prior_scale_list: List of prior scales for each holiday column.
         holiday_names: List of names of holidays
         """
-        # Holds columns of our future matrix.
-        expanded_holidays = defaultdict(lambda: np.zeros(dates.shape[0]))
-        prior_scales = {}
-        # Makes an index so we can perform `get_loc` below.
-        # Strip to just dates.
-        row_index = pd.DatetimeIndex(dates.apply(lambda x: x.date()))
-
-        for _ix, row in holidays.iterrows():
-            dt = row.ds.date()
-            try:
-                lw = int(row.get('lower_window', 0))
-                uw = int(row.get('upper_window', 0))
-            except ValueError:
-                lw = 0
-                uw = 0
-            ps = float(row.get('prior_scale', self.holidays_prior_scale))
-            if np.isnan(ps):
-                ps = float(self.holidays_prior_scale)
-            if row.holiday in prior_scales and prior_scales[row.holiday] != ps:
-                raise ValueError(
-                    'Holiday {holiday!r} does not have consistent prior '
-                    'scale specification.'.format(holiday=row.holiday)
-                )
-            if ps <= 0:
-                raise ValueError('Prior scale must be > 0')
-            prior_scales[row.holiday] = ps
-
-            for offset in range(lw, uw + 1):
-                occurrence = dt + timedelta(days=offset)
-                try:
-                    loc = row_index.get_loc(occurrence)
-                except KeyError:
-                    loc = None
-                key = '{}_delim_{}{}'.format(
-                    row.holiday,
-                    '+' if offset >= 0 else '-',
-                    abs(offset)
-                )
-                if loc is not None:
-                    expanded_holidays[key][loc] = 1.
-                else:
-                    expanded_holidays[key]  # Access key to generate value
-        holiday_features = pd.DataFrame(expanded_holidays)
-        # Make sure column order is consistent
-        holiday_features = holiday_features[sorted(holiday_features.columns
-                                                                   .tolist())]
+        features, columns, prior_scales = self.holiday_feature_matrix(
+            dates, holidays)
+        holiday_features = pd.DataFrame(features, columns=columns)
         prior_scale_list = [
             prior_scales[h.split('_delim_')[0]]
             for h in holiday_features.columns
@@ -580,6 +616,106 @@ class Prophet(object):
             self.train_holiday_names = pd.Series(holiday_names)
         return holiday_features, prior_scale_list, holiday_names
 
+    def holiday_feature_matrix(self, dates, holidays):
+        """Matrix of holiday features, see make_holiday_features.
+
+        Parameters
+        ----------
+        dates: pd.Series containing timestamps used for computing seasonality.
+        holidays: pd.Dataframe containing holidays, as returned by
+            construct_holiday_dataframe.
+
+        Returns
+        -------
+        features: np.array with a column for each holiday and offset.
+        columns: List of the names of the columns, sorted.
+        prior_scales: OrderedDict with the prior scale of each holiday, in
+            the order in which they appear in holidays.
+        """
+        names = holidays['holiday'].values
+
+        # Windows that are not valid integers are replaced by 0, on both sides
+        lw = self._holiday_column(holidays, 'lower_window', 0.)
+        uw = self._holiday_column(holidays, 'upper_window', 0.)
+        invalid = np.isnan(lw) | np.isnan(uw)
+        lw = np.where(invalid, 0, np.trunc(lw)).astype(np.int64)
+        uw = np.where(invalid, 0, np.trunc(uw)).astype(np.int64)
+
+        ps = self._holiday_column(
+            holidays, 'prior_scale', self.holidays_prior_scale)
+        ps[np.isnan(ps)] = float(self.holidays_prior_scale)
+        # The first prior scale of every holiday is the one used. Report the
+        # first row that is inconsistent with it or that is not positive.
+        name_codes, unique_names = pd.factorize(names)
+        first_row = np.full(len(unique_names), len(names))
+        np.minimum.at(first_row, name_codes, np.arange(len(names)))
+        inconsistent = ps != ps[first_row][name_codes]
+        bad = np.flatnonzero(inconsistent | (ps <= 0))
+        if len(bad) > 0:
+            if inconsistent[bad[0]]:
+                raise ValueError(
+                    'Holiday {holiday!r} does not have consistent prior '
+                    'scale specification.'.format(holiday=names[bad[0]])
+                )
+            raise ValueError('Prior scale must be > 0')
+        prior_scales = OrderedDict(
+            (name, float(scale))
+            for name, scale in zip(unique_names, ps[first_row])
+        )
+
+        # Expand the windows into an occurrence for every row and offset
+        counts = np.maximum(uw - lw + 1, 0)
+        row = np.repeat(np.arange(len(names)), counts)
+        offset = lw[row] + np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts)
+
+        # Every distinct holiday and offset is a column, the columns are
+        # sorted by name
+        min_offset = offset.min(initial=0)
+        pair_code = name_codes[row] * (offset.max(initial=0) - min_offset + 1) + (
+            offset - min_offset)
+        _pair_codes, pair_index, occurrence_pair = np.unique(
+            pair_code, return_index=True, return_inverse=True)
+        pair_names = np.array([
+            '{}_delim_{}{}'.format(
+                unique_names[name_codes[row[i]]],
+                '+' if offset[i] >= 0 else '-', abs(offset[i]))
+            for i in pair_index
+        ], dtype=str)
+        columns, pair_column = np.unique(pair_names, return_inverse=True)
+        occurrence_column = pair_column[occurrence_pair]
+
+        # Match the days of the occurrences with the days of the dates. Every
+        # row on the day of an occurrence is set, there can be many rows a day.
+        days = np.asarray(holidays['ds'], dtype='datetime64[ns]').astype(
+            'datetime64[D]')
+        valid = ~np.isnat(days[row])
+        occurrence_day = days[row][valid].astype(np.int64) + offset[valid]
+        occurrence_column = occurrence_column[valid]
+        date_days = np.asarray(dates, dtype='datetime64[ns]').astype(
+            'datetime64[D]').astype(np.int64)
+        order = np.argsort(date_days, kind='stable')
+        sorted_days = date_days[order]
+        lo = np.searchsorted(sorted_days, occurrence_day, side='left')
+        hi = np.searchsorted(sorted_days, occurrence_day, side='right')
+        n_matches = hi - lo
+        match = np.repeat(lo - np.cumsum(n_matches) + n_matches, n_matches) + (
+            np.arange(n_matches.sum()))
+
+        features = np.zeros((dates.shape[0], len(columns)))
+        features[order[match], np.repeat(occurrence_column, n_matches)] = 1.
+        return features, columns.tolist(), prior_scales
+
+    @staticmethod
+    def _holiday_column(holidays, name, default):
+        """Values of a column of the holidays as floats, or the default when
+        the holidays don't have that column.
+        """
+        if name not in holidays:
+            return np.full(holidays.shape[0], float(default))
+        return pd.to_numeric(holidays[name], errors='coerce').to_numpy(
+            dtype=float, copy=True)
+
     def add_regressor(self, name, prior_scale=None, standardize='auto',
                       mode=None):
         """Add an additional regressor to be used for fitting and predicting.
@@ -769,6 +905,8 @@ class Prophet(object):
                 name,
             )
             if props['condition_name'] is not None:
+                # the features share the cached Fourier series
+                features = features.copy()
                 features[~df[props['condition_name']]] = 0
             seasonal_features.append(features)
             prior_scales.extend(
@@ -803,6 +941,53 @@ class Prophet(object):
         )
         return seasonal_features, prior_scales, component_cols, modes
 
+    def make_feature_matrix(self, df, dtype=np.float64):
+        """Matrix of the seasonality, holiday and regressor features, with
+        the columns of the features of the history.
+
+        Unlike make_all_seasonality_features, the features are written
+        directly in a single matrix, without building a dataframe for each
+        group of features. The columns of the matrix are those of
+        train_component_cols.
+
+        Parameters
+        ----------
+        df: Prediction dataframe, as returned by setup_dataframe.
+        dtype: Floating point type of the matrix.
+
+        Returns
+        -------
+        np.array with a row for every row of df.
+        """
+        if self.train_feature_names is None:
+            # Models serialized before the feature names were kept
+            seasonal_features, _, _, _ = self.make_all_seasonality_features(df)
+            return np.ascontiguousarray(seasonal_features.values, dtype=dtype)
+
+        index = {name: i for i, name in enumerate(self.train_feature_names)}
+        X = np.zeros((df.shape[0], len(index)), dtype=dtype)
+        for name, props in self.seasonalities.items():
+            features = self.fourier_series(
+                df['ds'], props['period'], props['fourier_order'])
+            start = index['{}_delim_1'.format(name)]
+            block = X[:, start:start + features.shape[1]]
+            block[...] = features
+            if props['condition_name'] is not None:
+                block[~np.asarray(df[props['condition_name']], dtype=bool)] = 0
+
+        holidays = self.construct_holiday_dataframe(df['ds'])
+        if len(holidays) > 0:
+            features, columns, _ = self.holiday_feature_matrix(
+                df['ds'], holidays)
+            try:
+                X[:, [index[c] for c in columns]] = features
+            except KeyError:
+                raise Exception('A bug occurred in constructing regressors.')
+
+        for name in self.extra_regressors:
+            X[:, index[name]] = np.asarray(df[name], dtype=dtype)
+        return X
+
     def regressor_column_matrix(self, seasonal_features, modes):
         """Dataframe indicating which columns of the feature matrix correspond
         to which seasonality/regressor components.
@@ -1049,7 +1234,7 @@ class Prophet(object):
         k = (L0 - L1) / T
         return (k, m)
 
-    def fit(self, df, **kwargs):
+    def fit(self, df, init=None, **kwargs):
         """Fit the Prophet model.
 
         This sets self.params to contain the fitted model parameters. It is a
@@ -1067,6 +1252,11 @@ class Prophet(object):
             type) and y, the time series. If self.growth is 'logistic', then
             df must also have a column cap that specifies the capacity at
             each ds.
+        init: Optional fitted Prophet object, or dictionary of parameters as
+            returned by utilities.warm_start_params, used as the starting
+            point of the optimizer instead of the default initialization.
+            Refitting with the parameters of a model fit to almost the same
+            data takes a lot fewer iterations.
         kwargs: Additional arguments passed to the optimizing or sampling
             functions in Stan.
 
@@ -1074,6 +1264,36 @@ class Prophet(object):
         -------
         The fitted Prophet object.
         """
+        stan_init, dat = self.preprocess(df, init=init, **kwargs)
+
+        params = self.trivial_params()
+        if params is None and self.mcmc_samples > 0:
+            params = self.stan_backend.sampling(stan_init, dat, self.mcmc_samples, **kwargs)
+        elif params is None:
+            params = self.stan_backend.fit(stan_init, dat, **kwargs)
+
+        self.set_params(params)
+        return self
+
+    def preprocess(self, df, init=None, **kwargs):
+        """Prepare the model for fitting to the history in df.
+
+        Sets up the history, seasonalities and changepoints of the model,
+        and computes the input to the Stan model. This is the part of fit
+        before running Stan.
+
+        Parameters
+        ----------
+        df: pd.DataFrame containing the history, as in fit.
+        init: Optional initial values of the parameters, as in fit.
+        kwargs: Additional arguments passed to the optimizing or sampling
+            functions in Stan.
+
+        Returns
+        -------
+        A tuple (stan_init, dat) with the initial values of the parameters
+        and the data for the Stan model.
+        """
         if self.history is not None:
             raise Exception('Prophet object can only be fit once. '
                             'Instantiate a new object.')
@@ -1082,7 +1302,10 @@ class Prophet(object):
                 'Dataframe must have columns "ds" and "y" with the dates and '
                 'values respectively.'
             )
-        history = df[df['y'].notnull()].copy()
+        # setup_dataframe replaces the columns it changes, so a shallow copy
+        # is enough to leave df unchanged
+        observed = df['y'].notnull()
+        history = (df if observed.all() else df[observed]).copy(deep=False)
         if history.shape[0] < 2:
             raise ValueError('Dataframe has less than 2 non-NaN rows.')
         self.history_dates = pd.to_datetime(df['ds']).sort_values()
@@ -1093,6 +1316,7 @@ class Prophet(object):
         seasonal_features, prior_scales, component_cols, modes = (
             self.make_all_seasonality_features(history))
         self.train_component_cols = component_cols
+        self.train_feature_names = list(seasonal_features.columns)
         self.component_modes = modes
         self.fit_kwargs = deepcopy(kwargs)
 
@@ -1127,18 +1351,101 @@ class Prophet(object):
             'beta': np.zeros(seasonal_features.shape[1]),
             'sigma_obs': 1,
         }
+        if init is not None:
+            stan_init = self.warm_start_init(stan_init, init)
+        return stan_init, dat
 
-        if (history['y'].min() == history['y'].max()
-            and self.growth == 'linear'):
-            # Nothing to fit.
-            self.params = stan_init
-            self.params['sigma_obs'] = 1e-9
-            for par in self.params:
-                self.params[par] = np.array([self.params[par]])
-        elif self.mcmc_samples > 0:
-            self.params = self.stan_backend.sampling(stan_init, dat, self.mcmc_samples, **kwargs)
+    def warm_start_init(self, stan_init, init):
+        """Replace the default initial values of the parameters with those
+        in init.
+
+        The parameters are converted from the scaling of the history of the
+        model they come from to that of this model, when init has the scaling
+        (y_scale, start, t_scale). A parameter keeps its default value if its
+        shape in init doesn't match, which happens when the number of
+        changepoints or seasonality features of the model has changed.
+
+        Parameters
+        ----------
+        stan_init: Dictionary with the default initial values.
+        init: Fitted Prophet object, or dictionary of parameters as returned
+            by utilities.warm_start_params.
+
+        Returns
+        -------
+        Dictionary with the initial values of the parameters.
+        """
+        if isinstance(init, Prophet):
+            init = warm_start_params(init)
+        if all(init.get(name) is not None for name in ['y_scale', 'start', 't_scale']):
+            init = self._rescale_init(init)
+        stan_init = dict(stan_init)
+        for par, default in stan_init.items():
+            value = np.asarray(init.get(par, np.nan), dtype=float)
+            if value.shape != np.shape(default) or not np.all(np.isfinite(value)):
+                logger.debug('Ignoring the initial value of %s, it does not '
+                             'match the model.', par)
+                continue
+            stan_init[par] = value if value.ndim else float(value)
+        return stan_init
+
+    def _rescale_init(self, init):
+        """Convert the parameters in init, fit to a history with the scaling
+        in init, to the scaling of the history of this model.
+        """
+        # new = old * y_ratio for values of y, new = old * t_ratio for slopes
+        # and t_shift is the new start in the old scaling of t
+        y_ratio = init['y_scale'] / self.y_scale
+        t_ratio = self.t_scale / init['t_scale']
+        t_shift = (self.start - init['start']) / init['t_scale']
+
+        init = dict(init)
+        k, m = init['k'], init['m']
+        if self.growth == 'linear':
+            init['k'] = k * y_ratio * t_ratio
+            init['m'] = (m + k * t_shift) * y_ratio
+            init['delta'] = np.asarray(init['delta']) * y_ratio * t_ratio
         else:
-            self.params = self.stan_backend.fit(stan_init, dat, **kwargs)
+            init['k'] = k * t_ratio
+            init['m'] = (m - t_shift) / t_ratio
+            init['delta'] = np.asarray(init['delta']) * t_ratio
+        # Multiplicative components are relative to the trend, only the
+        # additive ones are in the scale of y
+        beta = np.asarray(init['beta'])
+        additive = np.asarray(self.train_component_cols['additive_terms'])
+        if beta.shape == additive.shape:
+            init['beta'] = np.where(additive > 0, beta * y_ratio, beta)
+        init['sigma_obs'] = init['sigma_obs'] * y_ratio
+        return init
+
+    def trivial_params(self):
+        """Parameters of the model when there is nothing to fit.
+
+        Returns
+        -------
+        Dictionary of parameters if the history is constant with linear
+        growth, None otherwise.
+        """
+        if not (self.history['y'].min() == self.history['y'].max()
+                and self.growth == 'linear'):
+            return None
+        k, m = self.linear_growth_init(self.history)
+        return {
+            'k': np.array([k]),
+            'm': np.array([m]),
+            'delta': np.zeros((1, len(self.changepoints_t))),
+            'beta': np.zeros((1, self.train_component_cols.shape[0])),
+            'sigma_obs': np.array([1e-9]),
+        }
+
+    def set_params(self, params):
+        """Set the fitted parameters of the model.
+
+        Parameters
+        ----------
+        params: Dictionary of parameters, as returned by the Stan backend.
+        """
+        self.params = params
 
         # If no changepoints were requested, replace delta with 0s
         if len(self.changepoints) == 0:
@@ -1148,8 +1455,6 @@ class Prophet(object):
             self.params['delta'] = (np.zeros(self.params['delta'].shape)
                                       .reshape((-1, 1)))
 
-        return self
-
     def predict(self, df=None):
         """Predict using the prophet model.
 
@@ -1167,13 +1472,16 @@ class Prophet(object):
             raise Exception('Model has not been fit.')
 
         if df is None:
-            df = self.history.copy()
+            if self.history.shape[0] == 0:
+                raise ValueError('The model has no history, it was loaded '
+                                 'without it. Pass the dataframe to predict.')
+            df = self.history.copy(deep=False)
         else:
             if df.shape[0] == 0:
                 raise ValueError('Dataframe has no rows.')
-            df = self.setup_dataframe(df.copy())
+            df = self.setup_dataframe(df.copy(deep=False))
 
-        df['trend'] = self.predict_trend(df)
+        _set_column(df, 'trend', self.predict_trend(df))
         seasonal_components = self.predict_seasonal_components(df)
         if self.uncertainty_samples:
             intervals = self.predict_uncertainty(df)
@@ -1198,6 +1506,10 @@ class Prophet(object):
     def piecewise_linear(t, deltas, k, m, changepoint_ts):
         """Evaluate the piecewise linear function.
 
+        The function can be evaluated for a batch of n parameter draws at
+        once, by passing k and m as arrays of length n, and deltas (and
+        optionally changepoint_ts) as (n x S) matrices.
+
         Parameters
         ----------
         t: np.array of times on which the function is evaluated.
@@ -1208,23 +1520,21 @@ class Prophet(object):
 
         Returns
         -------
-        Vector y(t).
+        Vector y(t), or (n x T) matrix for a batch of parameters.
         """
-        # Intercept changes
-        gammas = -changepoint_ts * deltas
-        # Get cumulative slope and intercept at each t
-        k_t = k * np.ones_like(t)
-        m_t = m * np.ones_like(t)
-        for s, t_s in enumerate(changepoint_ts):
-            indx = t >= t_s
-            k_t[indx] += deltas[s]
-            m_t[indx] += gammas[s]
-        return k_t * t + m_t
+        t = np.asarray(t, dtype=float)
+        k_change, gamma = Prophet._cumulative_changes(t, deltas, changepoint_ts)
+        k, m = Prophet._batch_params(k, m, k_change)
+        # Intercept changes are -changepoint_ts * deltas
+        return (k + k_change) * t + m - gamma
 
     @staticmethod
     def piecewise_logistic(t, cap, deltas, k, m, changepoint_ts):
         """Evaluate the piecewise logistic function.
 
+        The function can be evaluated for a batch of parameter draws, as
+        piecewise_linear.
+
         Parameters
         ----------
         t: np.array of times on which the function is evaluated.
@@ -1236,24 +1546,86 @@ class Prophet(object):
 
         Returns
         -------
-        Vector y(t).
+        Vector y(t), or (n x T) matrix for a batch of parameters.
         """
-        # Compute offset changes
-        k_cum = np.concatenate((np.atleast_1d(k), np.cumsum(deltas) + k))
-        gammas = np.zeros(len(changepoint_ts))
-        for i, t_s in enumerate(changepoint_ts):
-            gammas[i] = (
-                    (t_s - m - np.sum(gammas))
-                    * (1 - k_cum[i] / k_cum[i + 1])  # noqa W503
-            )
-        # Get cumulative rate and offset at each t
-        k_t = k * np.ones_like(t)
-        m_t = m * np.ones_like(t)
-        for s, t_s in enumerate(changepoint_ts):
-            indx = t >= t_s
-            k_t[indx] += deltas[s]
-            m_t[indx] += gammas[s]
-        return cap / (1 + np.exp(-k_t * (t - m_t)))
+        t = np.asarray(t, dtype=float)
+        k_change, gamma = Prophet._cumulative_changes(t, deltas, changepoint_ts)
+        k, m = Prophet._batch_params(k, m, k_change)
+        # The offsets m_t that make the function continuous satisfy
+        # k_t * m_t = k * m + sum(changepoint_ts * deltas) over the
+        # changepoints before t, so k_t * (t - m_t) needs no recursion.
+        k_t = k + k_change
+        return np.asarray(cap) / (1 + np.exp(-(k_t * t - k * m - gamma)))
+
+    @staticmethod
+    def _batch_params(k, m, k_change):
+        """Shape k and m to broadcast with the cumulative changes, which are
+        a matrix with a row per draw for a batch of parameters.
+        """
+        k = np.asarray(k, dtype=float)
+        m = np.asarray(m, dtype=float)
+        if k_change.ndim == 2:
+            return k.reshape((-1, 1)), m.reshape((-1, 1))
+        return k, m
+
+    @staticmethod
+    def _cumulative_changes(t, deltas, changepoint_ts):
+        """Sums of the rate changes, and of the rate changes times the
+        changepoint times, over the changepoints at or before each t.
+
+        Parameters
+        ----------
+        t: np.array of T times.
+        deltas: np.array of S rate changes, or (n x S) matrix.
+        changepoint_ts: np.array of S changepoint times, or (n x S) matrix.
+
+        Returns
+        -------
+        Tuple of two vectors of length T, or (n x T) matrices if deltas or
+        changepoint_ts is a matrix.
+        """
+        deltas = np.asarray(deltas, dtype=float)
+        changepoint_ts = np.asarray(changepoint_ts, dtype=float)
+        batch = deltas.ndim == 2 or changepoint_ts.ndim == 2
+        n = max(np.atleast_2d(deltas).shape[0],
+                np.atleast_2d(changepoint_ts).shape[0])
+        S = deltas.shape[-1]
+        deltas = np.broadcast_to(deltas, (n, S))
+        cps = np.atleast_2d(changepoint_ts)
+
+        if S and np.any(np.diff(cps, axis=1) < 0):
+            order = np.argsort(cps, axis=1, kind='stable')
+            cps = np.take_along_axis(cps, order, axis=1)
+            deltas = np.take_along_axis(deltas, np.broadcast_to(order, (n, S)), axis=1)
+
+        cum_delta = np.zeros((n, S + 1))
+        np.cumsum(deltas, axis=1, out=cum_delta[:, 1:])
+        cum_gamma = np.zeros((n, S + 1))
+        np.cumsum(deltas * cps, axis=1, out=cum_gamma[:, 1:])
+
+        if cps.shape[0] == 1:
+            # Number of changepoints at or before each t
+            ix = np.searchsorted(cps[0], t, side='right')
+            k_change = cum_delta[:, ix]
+            gamma = cum_gamma[:, ix]
+        elif t.size and S:
+            # Every row has its own changepoints. Shift the values of each row
+            # by a multiple of their span, so that a single searchsorted on
+            # the flattened changepoints finds the changepoints of every row.
+            lo = min(t.min(), cps.min())
+            span = max(t.max(), cps.max()) - lo + 1
+            offsets = np.arange(n)[:, None] * span
+            ix = np.searchsorted((cps - lo + offsets).ravel(),
+                                 t - lo + offsets, side='right')
+            ix -= np.arange(n)[:, None] * S
+            k_change = np.take_along_axis(cum_delta, ix, axis=1)
+            gamma = np.take_along_axis(cum_gamma, ix, axis=1)
+        else:
+            k_change = gamma = np.zeros((n, t.size))
+
+        if not batch:
+            return k_change[0], gamma[0]
+        return k_change, gamma
 
     def predict_trend(self, df):
         """Predict trend using the prophet model.
@@ -1291,17 +1663,15 @@ class Prophet(object):
         -------
         Dataframe with seasonal components.
         """
-        seasonal_features, _, component_cols, _ = (
-            self.make_all_seasonality_features(df)
-        )
+        X = self.make_feature_matrix(df)
+        component_cols = self.train_component_cols.values
         if self.uncertainty_samples:
             lower_p = 100 * (1.0 - self.interval_width) / 2
             upper_p = 100 * (1.0 + self.interval_width) / 2
 
-        X = seasonal_features.values
         data = {}
-        for component in component_cols.columns:
-            beta_c = self.params['beta'] * component_cols[component].values
+        for i, component in enumerate(self.train_component_cols.columns):
+            beta_c = self.params['beta'] * component_cols[:, i]
 
             comp = np.matmul(X, beta_c.transpose())
             if component in self.component_modes['additive']:
@@ -1316,87 +1686,194 @@ class Prophet(object):
                 )
         return pd.DataFrame(data)
 
-    def sample_posterior_predictive(self, df):
+    def sample_posterior_predictive(self, df, dtype=np.float64, rng=None,
+                                    samp_per_iter=None):
         """Prophet posterior predictive samples.
 
+        All the samples are drawn together, as matrices.
+
         Parameters
         ----------
         df: Prediction dataframe.
+        dtype: Floating point type of the samples. np.float32 halves the
+            memory used by the samples, and the time to compute their
+            percentiles.
+        rng: np.random.Generator of the random numbers. Defaults to the
+            global state of np.random.
+        samp_per_iter: Number of samples drawn for every iteration of the
+            parameters. Defaults to enough samples for uncertainty_samples.
 
         Returns
         -------
         Dictionary with posterior predictive samples for the forecast yhat and
-        for the trend component.
+        for the trend component, each a matrix with a column for every sample.
         """
         n_iterations = self.params['k'].shape[0]
-        samp_per_iter = max(1, int(np.ceil(
-            self.uncertainty_samples / float(n_iterations)
-        )))
+        if samp_per_iter is None:
+            samp_per_iter = max(1, int(np.ceil(
+                self.uncertainty_samples / float(n_iterations)
+            )))
 
         # Generate seasonality features once so we can re-use them.
-        seasonal_features, _, component_cols, _ = (
-            self.make_all_seasonality_features(df)
-        )
-
-        sim_values = {'yhat': [], 'trend': []}
-        for i in range(n_iterations):
-            for _j in range(samp_per_iter):
-                sim = self.sample_model(
-                    df=df,
-                    seasonal_features=seasonal_features,
-                    iteration=i,
-                    s_a=component_cols['additive_terms'],
-                    s_m=component_cols['multiplicative_terms'],
-                )
-                for key in sim_values:
-                    sim_values[key].append(sim[key])
-        for k, v in sim_values.items():
-            sim_values[k] = np.column_stack(v)
-        return sim_values
+        X = self.make_feature_matrix(df, dtype=dtype)
+        beta = np.asarray(self.params['beta'], dtype=dtype).reshape(
+            (n_iterations, -1))
+        s_a = self.train_component_cols['additive_terms'].values.astype(dtype)
+        s_m = self.train_component_cols['multiplicative_terms'].values.astype(
+            dtype)
+        # Samples are grouped by iteration, as (iteration, sample, time)
+        Xb_a = np.matmul(beta * s_a, X.T)[:, None, :] * self.y_scale
+        Xb_m = np.matmul(beta * s_m, X.T)[:, None, :]
+
+        iterations = np.repeat(np.arange(n_iterations), samp_per_iter)
+        shape = (n_iterations, samp_per_iter, df.shape[0])
+        trend = self.sample_predictive_trend(df, iterations, rng=rng).astype(
+            dtype, copy=False).reshape(shape)
+
+        sigma = np.asarray(self.params['sigma_obs'], dtype=dtype).reshape(
+            (n_iterations, 1, 1))
+        if rng is None:
+            rng = np.random
+        noise = rng.standard_normal(shape).astype(dtype, copy=False)
+        noise *= sigma * self.y_scale
+
+        yhat = trend * (1 + Xb_m) + Xb_a + noise
+        return {
+            'yhat': yhat.reshape((-1, df.shape[0])).T,
+            'trend': trend.reshape((-1, df.shape[0])).T,
+        }
 
-    def predictive_samples(self, df):
+    def predictive_samples(self, df, dtype=np.float64):
         """Sample from the posterior predictive distribution.
 
         Parameters
         ----------
         df: Dataframe with dates for predictions (column ds), and capacity
             (column cap) if logistic growth.
+        dtype: Floating point type of the samples, see
+            sample_posterior_predictive.
 
         Returns
         -------
         Dictionary with keys "trend" and "yhat" containing
         posterior predictive samples for that component.
         """
-        df = self.setup_dataframe(df.copy())
-        sim_values = self.sample_posterior_predictive(df)
+        df = self.setup_dataframe(df.copy(deep=False))
+        rng = self.random_generators(1)[0]
+        sim_values = self.sample_posterior_predictive(df, dtype=dtype, rng=rng)
         return sim_values
 
-    def predict_uncertainty(self, df):
+    def predict_uncertainty(self, df, dtype=np.float64, max_block_size=2 ** 22):
         """Prediction intervals for yhat and trend.
 
+        The intervals of every row only depend on the samples of that row,
+        so the rows are processed in blocks, with the samples of one block
+        in memory at a time. The trend at a date only depends on the
+        changepoints before it, so simulating the trend of a block on its own
+        gives samples from the same distribution. The percentiles are exact.
+        With a seed, every block has its own random stream, see
+        random_generators.
+
+        When a row has more samples than max_block_size, every row is a
+        block of its own, and its samples are drawn in chunks of at most
+        max_block_size samples, into a buffer with all the samples of the
+        row, which the exact percentiles need.
+
         Parameters
         ----------
         df: Prediction dataframe.
+        dtype: Floating point type of the samples, see
+            sample_posterior_predictive.
+        max_block_size: Maximum number of samples, over all the rows of a
+            block, drawn at once. The memory used is bounded by that many
+            samples, whatever the number of rows, plus the buffer of the
+            samples of a row when they are more.
 
         Returns
         -------
         Dataframe with uncertainty intervals.
         """
-        sim_values = self.sample_posterior_predictive(df)
+        n_iterations = self.params['k'].shape[0]
+        samp_per_iter = max(1, int(np.ceil(
+            self.uncertainty_samples / float(n_iterations)
+        )))
+        n_samples = n_iterations * samp_per_iter
+        block_rows = max(1, max_block_size // n_samples)
+        # Samples per iteration drawn at once, every iteration gets at least
+        # one
+        chunk = max(1, min(samp_per_iter, max_block_size // n_iterations))
 
         lower_p = 100 * (1.0 - self.interval_width) / 2
         upper_p = 100 * (1.0 + self.interval_width) / 2
 
-        series = {}
-        for key in ['yhat', 'trend']:
-            series['{}_lower'.format(key)] = self.percentile(
-                sim_values[key], lower_p, axis=1)
-            series['{}_upper'.format(key)] = self.percentile(
-                sim_values[key], upper_p, axis=1)
+        series = {
+            '{}_{}'.format(key, bound): []
+            for key in ['yhat', 'trend'] for bound in ['lower', 'upper']
+        }
+        starts = range(0, max(df.shape[0], 1), block_rows)
+        rngs = self.random_generators(len(starts))
+        for start, rng in zip(starts, rngs):
+            # The features are aligned on the index, which must start at 0
+            block = df.iloc[start:start + block_rows].reset_index(drop=True)
+            if chunk == samp_per_iter:
+                sim_values = self.sample_posterior_predictive(
+                    block, dtype=dtype, rng=rng)
+            else:
+                sim_values = self._sample_in_chunks(
+                    block, samp_per_iter, chunk, dtype=dtype, rng=rng)
+            for key in ['yhat', 'trend']:
+                series['{}_lower'.format(key)].append(self.percentile(
+                    sim_values[key], lower_p, axis=1))
+                series['{}_upper'.format(key)].append(self.percentile(
+                    sim_values[key], upper_p, axis=1))
+
+        return pd.DataFrame({
+            name: np.concatenate(blocks) for name, blocks in series.items()
+        })
+
+    def _sample_in_chunks(self, df, samp_per_iter, chunk, dtype, rng):
+        """Posterior predictive samples of df, drawn chunk samples per
+        iteration at a time, see sample_posterior_predictive.
+        """
+        n_samples = self.params['k'].shape[0] * samp_per_iter
+        sim_values = {
+            key: np.empty((df.shape[0], n_samples), dtype=dtype)
+            for key in ['yhat', 'trend']
+        }
+        col = 0
+        for first in range(0, samp_per_iter, chunk):
+            values = self.sample_posterior_predictive(
+                df, dtype=dtype, rng=rng,
+                samp_per_iter=min(chunk, samp_per_iter - first))
+            n = values['yhat'].shape[1]
+            for key in sim_values:
+                sim_values[key][:, col:col + n] = values[key]
+            col += n
+        return sim_values
+
+    def random_generators(self, n):
+        """Independent random generators derived from the seed.
+
+        The i-th generator is spawned from the seed with the spawn key i, so
+        it only depends on the seed and on i, and the same streams are
+        obtained whether the blocks are sampled serially or in parallel.
+
+        Parameters
+        ----------
+        n: Number of generators.
 
-        return pd.DataFrame(series)
+        Returns
+        -------
+        List of n np.random.Generator, or of n None to use the global state
+        of np.random when the model has no seed.
+        """
+        if self.seed is None:
+            return [None] * n
+        return [np.random.default_rng(spawn_seed(self.seed, i))
+                for i in range(n)]
 
-    def sample_model(self, df, seasonal_features, iteration, s_a, s_m):
+    def sample_model(self, df, seasonal_features, iteration, s_a, s_m,
+                     rng=None):
         """Simulate observations from the extrapolated generative model.
 
         Parameters
@@ -1406,12 +1883,16 @@ class Prophet(object):
         iteration: Int sampling iteration to use parameters from.
         s_a: Indicator vector for additive components
         s_m: Indicator vector for multiplicative components
+        rng: np.random.Generator of the random numbers. Defaults to the
+            global state of np.random.
 
         Returns
         -------
         Dataframe with trend and yhat, each like df['t'].
         """
-        trend = self.sample_predictive_trend(df, iteration)
+        trend = self.sample_predictive_trend(df, iteration, rng=rng)
+        if rng is None:
+            rng = np.random
 
         beta = self.params['beta'][iteration]
         Xb_a = np.matmul(seasonal_features.values,
@@ -1419,28 +1900,36 @@ class Prophet(object):
         Xb_m = np.matmul(seasonal_features.values, beta * s_m.values)
 
         sigma = self.params['sigma_obs'][iteration]
-        noise = np.random.normal(0, sigma, df.shape[0]) * self.y_scale
+        noise = rng.normal(0, sigma, df.shape[0]) * self.y_scale
 
         return pd.DataFrame({
             'yhat': trend * (1 + Xb_m) + Xb_a + noise,
             'trend': trend
         })
 
-    def sample_predictive_trend(self, df, iteration):
+    def sample_predictive_trend(self, df, iteration, rng=None):
         """Simulate the trend using the extrapolated generative model.
 
         Parameters
         ----------
         df: Prediction dataframe.
-        iteration: Int sampling iteration to use parameters from.
+        iteration: Int sampling iteration to use parameters from, or array
+            of iterations to simulate a trend for each of them at once.
+        rng: np.random.Generator of the random numbers. Defaults to the
+            global state of np.random.
 
         Returns
         -------
-        np.array of simulated trend over df['t'].
+        np.array of simulated trend over df['t'], or matrix with a row for
+        each iteration.
         """
-        k = self.params['k'][iteration]
-        m = self.params['m'][iteration]
-        deltas = self.params['delta'][iteration]
+        if rng is None:
+            rng = np.random
+        iterations = np.atleast_1d(iteration)
+        n = len(iterations)
+        k = np.asarray(self.params['k'])[iterations].reshape(n)
+        m = np.asarray(self.params['m'])[iterations].reshape(n)
+        deltas = np.asarray(self.params['delta'])[iterations].reshape((n, -1))
 
         t = np.array(df['t'])
         T = t.max()
@@ -1448,25 +1937,31 @@ class Prophet(object):
         # New changepoints from a Poisson process with rate S on [1, T]
         if T > 1:
             S = len(self.changepoints_t)
-            n_changes = np.random.poisson(S * (T - 1))
+            n_changes = rng.poisson(S * (T - 1), size=n)
         else:
-            n_changes = 0
-        if n_changes > 0:
-            changepoint_ts_new = 1 + np.random.rand(n_changes) * (T - 1)
-            changepoint_ts_new.sort()
+            n_changes = np.zeros(n, dtype=int)
+
+        # Every sample has its own number of new changepoints. Pad them to
+        # the same number, with deltas of 0 which don't change the trend.
+        max_changes = n_changes.max() if n else 0
+        changepoint_ts_new = 1 + rng.random((n, max_changes)) * (T - 1)
+        if max_changes > 0:
+            # Get the empirical scale of the deltas, plus epsilon to avoid NaNs.
+            lambda_ = np.mean(np.abs(deltas), axis=1) + 1e-8
+            # Sample deltas
+            deltas_new = rng.laplace(0, 1, (n, max_changes)) * lambda_[:, None]
+            deltas_new[np.arange(max_changes) >= n_changes[:, None]] = 0
         else:
-            changepoint_ts_new = []
-
-        # Get the empirical scale of the deltas, plus epsilon to avoid NaNs.
-        lambda_ = np.mean(np.abs(deltas)) + 1e-8
-
-        # Sample deltas
-        deltas_new = np.random.laplace(0, lambda_, n_changes)
+            deltas_new = np.zeros((n, 0))
 
         # Prepend the times and deltas from the history
-        changepoint_ts = np.concatenate((self.changepoints_t,
-                                         changepoint_ts_new))
-        deltas = np.concatenate((deltas, deltas_new))
+        if max_changes > 0:
+            changepoint_ts = np.concatenate(
+                (np.broadcast_to(self.changepoints_t, (n, len(self.changepoints_t))),
+                 changepoint_ts_new), axis=1)
+            deltas = np.concatenate((deltas, deltas_new), axis=1)
+        else:
+            changepoint_ts = self.changepoints_t
 
         if self.growth == 'linear':
             trend = self.piecewise_linear(t, deltas, k, m, changepoint_ts)
@@ -1475,7 +1970,10 @@ class Prophet(object):
             trend = self.piecewise_logistic(t, cap, deltas, k, m,
                                             changepoint_ts)
 
-        return trend * self.y_scale + df['floor']
+        trend = trend * self.y_scale + np.asarray(df['floor'])
+        if np.ndim(iteration) == 0:
+            return trend[0]
+        return trend
 
     def percentile(self, a, *args, **kwargs):
         """
@@ -6,6 +6,8 @@
 
 from __future__ import absolute_import, division, print_function
 
+import functools
+import threading
 import warnings
 
 import numpy as np
@@ -14,10 +16,29 @@ import pandas as pd
 from . import hdays as hdays_part2
 import holidays as hdays_part1
 
+# Holidays of every (country, year) computed so far, shared by all the models
+# of the process. The tables are never modified once added.
+_holidays_cache = {}
+_holidays_lock = threading.Lock()
+
+
+def _country_holidays(country, years):
+    """Holidays object of a country, from hdays or else from holidays."""
+    try:
+        return getattr(hdays_part2, country)(years=years)
+    except AttributeError:
+        try:
+            return getattr(hdays_part1, country)(years=years)
+        except AttributeError:
+            raise AttributeError(
+                "Holidays in {} are not currently supported!".format(country))
+
 
 def get_holiday_names(country):
     """Return all possible holiday names of given country
 
+    The names are computed once for every country.
+
     Parameters
     ----------
     country: country name
@@ -26,6 +47,11 @@ def get_holiday_names(country):
     -------
     A set of all possible holiday names of given country
     """
+    return set(_holiday_names(country))
+
+
+@functools.lru_cache(maxsize=None)
+def _holiday_names(country):
     years = np.arange(1995, 2045)
     try:
         with warnings.catch_warnings():
@@ -37,12 +63,15 @@ def get_holiday_names(country):
         except AttributeError:
             raise AttributeError(
                 "Holidays in {} are not currently supported!".format(country))
-    return set(holiday_names)
+    return frozenset(holiday_names)
 
 
 def make_holidays_df(year_list, country):
     """Make dataframe of holidays for given years and countries
 
+    The holidays of every country and year are computed once, and kept in
+    a cache shared by all the models, see precompute_holidays.
+
     Parameters
     ----------
     year_list: a list of years
@@ -53,15 +82,107 @@ def make_holidays_df(year_list, country):
     Dataframe with 'ds' and 'holiday', which can directly feed
     to 'holidays' params in Prophet
     """
-    try:
-        holidays = getattr(hdays_part2, country)(years=year_list)
-    except AttributeError:
-        try:
-            holidays = getattr(hdays_part1, country)(years=year_list)
-        except AttributeError:
-            raise AttributeError(
-                "Holidays in {} are not currently supported!".format(country))
+    years = tuple(sorted({int(year) for year in year_list}))
+    if not years:
+        return _holidays_table(_country_holidays(country, []))
+    return _years_holidays(country, years).copy()
+
+
+@functools.lru_cache(maxsize=128)
+def _years_holidays(country, years):
+    # The models of many keys usually have the same years, keep the tables
+    # of the last ones joined
+    holidays_df = pd.concat(
+        [_year_holidays(country, year) for year in years], ignore_index=True)
+    if holidays_df['ds'].duplicated().any():
+        # The holidays of a year can fall in the next or the previous one
+        # when observed. Join the names of a day as the holidays package does.
+        holidays_df = holidays_df.groupby('ds', sort=False)['holiday'].agg(
+            _join_holiday_names).reset_index()
+    return holidays_df
+
+
+def _join_holiday_names(names):
+    delimiter = ', '
+    return delimiter.join(sorted({
+        name for names_day in names for name in names_day.split(delimiter)
+    }))
+
+
+def _holidays_table(holidays):
     holidays_df = pd.DataFrame(list(holidays.items()), columns=['ds', 'holiday'])
     holidays_df.reset_index(inplace=True, drop=True)
     holidays_df['ds'] = pd.to_datetime(holidays_df['ds'])
-    return (holidays_df)
+    return holidays_df
+
+
+def _year_holidays(country, year):
+    key = (country, year)
+    with _holidays_lock:
+        holidays_df = _holidays_cache.get(key)
+    if holidays_df is None:
+        holidays_df = _holidays_table(_country_holidays(country, [year]))
+        with _holidays_lock:
+            holidays_df = _holidays_cache.setdefault(key, holidays_df)
+    return holidays_df
+
+
+def precompute_holidays(countries, years):
+    """Compute the holidays of the countries for the years, and add them to
+    the cache used by make_holidays_df.
+
+    Parameters
+    ----------
+    countries: list of country names.
+    years: list of years.
+    """
+    for country in countries:
+        for year in years:
+            _year_holidays(country, int(year))
+
+
+def save_holidays_cache(path):
+    """Save the holidays of the cache to a parquet file, as a table with
+    the columns country, year, ds and holiday.
+
+    Parameters
+    ----------
+    path: Path of the parquet file.
+    """
+    with _holidays_lock:
+        items = sorted(_holidays_cache.items())
+    tables = []
+    for (country, year), holidays_df in items:
+        if holidays_df.empty:
+            # Keep the years without holidays, as a row without a date
+            holidays_df = pd.DataFrame({'ds': [pd.NaT], 'holiday': [None]})
+        tables.append(holidays_df.assign(country=country, year=year))
+    columns = ['country', 'year', 'ds', 'holiday']
+    if tables:
+        table = pd.concat(tables, ignore_index=True)[columns]
+    else:
+        table = pd.DataFrame({
+            'country': pd.Series(dtype=object),
+            'year': pd.Series(dtype=np.int64),
+            'ds': pd.Series(dtype='datetime64[ns]'),
+            'holiday': pd.Series(dtype=object),
+        })
+    table.to_parquet(path, index=False)
+
+
+def load_holidays_cache(path):
+    """Add the holidays saved by save_holidays_cache to the cache, so that
+    they are not computed again.
+
+    Parameters
+    ----------
+    path: Path of the parquet file.
+    """
+    table = pd.read_parquet(path)
+    table['ds'] = pd.to_datetime(table['ds'])
+    loaded = {}
+    for (country, year), rows in table.groupby(['country', 'year'], sort=False):
+        holidays_df = rows.loc[rows['ds'].notnull(), ['ds', 'holiday']]
+        loaded[(country, int(year))] = holidays_df.reset_index(drop=True)
+    with _holidays_lock:
+        _holidays_cache.update(loaded)
@@ -263,9 +263,63 @@ class PyStanBackend(IStanBackend):
             return pickle.load(f)
 
 
+class NumPyBackend(IStanBackend):
+    """Computes the MAP estimate of the Prophet model in NumPy/SciPy.
+
+    It needs no compiled Stan model, so it is always available. The fit
+    runs in-process with L-BFGS-B (see optimizer.fit_map), which avoids the
+    overhead of running Stan, large for short series. MCMC sampling is not
+    supported.
+
+    The arguments of the optimizing function of Stan, like iter, are passed
+    to the optimizer when it has an equivalent option, and ignored
+    otherwise.
+    """
+
+    # The arguments of the optimizing function of Stan that have an
+    # equivalent option of the optimizer, and the name of the option
+    STAN_ARGS = {'iter': 'maxiter', 'history_size': 'maxcor', 'tol_grad': 'gtol'}
+    # The options of the optimizer, see optimizer.fit_map
+    OPTIMIZER_ARGS = {'maxiter', 'maxcor', 'ftol', 'gtol', 'maxfun', 'maxls'}
+
+    @staticmethod
+    def get_type():
+        return StanBackendEnum.NUMPY.name
+
+    @staticmethod
+    def build_model(target_dir, model_dir):
+        # Nothing to compile
+        pass
+
+    def load_model(self):
+        return None
+
+    def fit(self, stan_init, stan_data, **kwargs) -> dict:
+        from .optimizer import fit_map
+        options = {}
+        for name, value in kwargs.items():
+            if name in self.STAN_ARGS:
+                options[self.STAN_ARGS[name]] = value
+            elif name in self.OPTIMIZER_ARGS:
+                options[name] = value
+            else:
+                # Like algorithm, the arguments that only apply to Stan
+                self.logger.debug(
+                    'Ignoring the argument %s, not used by the NUMPY backend', name)
+        return fit_map(stan_init, stan_data, **options)
+
+    def sampling(self, stan_init, stan_data, samples, **kwargs) -> dict:
+        raise ValueError(
+            'MCMC sampling needs Stan, the NUMPY backend only computes the '
+            'MAP estimate. Use the PYSTAN or CMDSTANPY backend with '
+            'mcmc_samples > 0.'
+        )
+
+
 class StanBackendEnum(Enum):
     PYSTAN = PyStanBackend
     CMDSTANPY = CmdStanPyBackend
+    NUMPY = NumPyBackend
 
     @staticmethod
     def get_backend_class(name: str) -> IStanBackend:
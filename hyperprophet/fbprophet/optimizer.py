@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""MAP estimation of the Prophet model in NumPy/SciPy.
+
+The Prophet model is fit by maximizing the same posterior as the Stan model,
+using L-BFGS-B with analytic gradients. The changepoint deltas are split
+into their positive and negative parts, bounded below by 0, which makes the
+Laplace prior on them smooth for the optimizer.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+
+import numpy as np
+from scipy.optimize import minimize
+
+logger = logging.getLogger('fbprophet')
+
+# Scale of the normal priors on k and m, and of the half-normal prior on
+# sigma_obs, in the Stan model.
+K_PRIOR_SCALE = 5.0
+M_PRIOR_SCALE = 5.0
+SIGMA_PRIOR_SCALE = 0.5
+
+# Lower bound of sigma_obs, in the scale of y. The posterior of a series that
+# the model fits exactly grows without bound as sigma_obs goes to 0.
+SIGMA_OBS_MIN = 1e-8
+
+
+class ModelData(object):
+    """The data of a Prophet model, as arrays for the optimizer.
+
+    Parameters
+    ----------
+    stan_data: Dictionary with the data for the Stan model, as returned by
+        Prophet.preprocess.
+    """
+
+    def __init__(self, stan_data):
+        self.logistic = int(stan_data['trend_indicator']) == 1
+        self.K = int(stan_data['K'])
+        self.S = int(stan_data['S'])
+
+        self.y = np.asarray(stan_data['y'], dtype=float)
+        self.t = np.asarray(stan_data['t'], dtype=float)
+        self.cap = np.asarray(stan_data['cap'], dtype=float)
+        self.X = np.asarray(stan_data['X'], dtype=float)
+        self.s_a = np.asarray(stan_data['s_a'], dtype=float)
+        self.s_m = np.asarray(stan_data['s_m'], dtype=float)
+        self.sigmas = np.asarray(stan_data['sigmas'], dtype=float)
+        self.t_change = np.asarray(stan_data['t_change'], dtype=float)
+        self.tau = float(stan_data['tau'])
+
+        # Phi[i, j] = (t_i - t_change_j) if t_i >= t_change_j else 0, so that
+        # the change of the trend due to the changepoints is Phi @ delta.
+        # With that, the trend of the Stan model is
+        #   linear: k * t + m + Phi @ delta
+        #   logistic: cap * inv_logit(k * (t - m) + Phi @ delta)
+        # The logistic form follows from the recursion for gamma in the Stan
+        # model, which gives k_i * m_i = k * m + sum(t_change[:i] * delta[:i]).
+        dt = self.t[:, None] - self.t_change[None, :]
+        self.Phi = np.where(dt >= 0, dt, 0.)
+        self.n_obs = len(self.y)
+
+    def pack(self, stan_init):
+        """Pack the initial values of the parameters into a vector.
+
+        The vector is [k, m, delta+ (S), delta- (S), beta (K), log(sigma_obs)],
+        where delta = delta+ - delta-.
+        """
+        S = self.S
+        delta = np.asarray(stan_init['delta'], dtype=float).reshape(-1)
+        theta = np.zeros(3 + 2 * S + self.K)
+        theta[0] = stan_init['k']
+        theta[1] = stan_init['m']
+        theta[2:2 + S] = np.maximum(delta, 0)
+        theta[2 + S:2 + 2 * S] = np.maximum(-delta, 0)
+        theta[2 + 2 * S:-1] = np.asarray(stan_init['beta'], dtype=float).reshape(-1)
+        # sigma_obs is constrained to be positive, optimize its log
+        theta[-1] = np.log(max(float(stan_init['sigma_obs']), SIGMA_OBS_MIN))
+        return theta
+
+    def bounds(self):
+        """Bounds of the parameters, for each element of the vector
+        returned by pack.
+        """
+        lower = np.full(3 + 2 * self.S + self.K, -np.inf)
+        lower[2:2 + 2 * self.S] = 0.
+        lower[-1] = np.log(SIGMA_OBS_MIN)
+        return [(lb, None) for lb in lower]
+
+    def unpack(self, theta):
+        """Returns the parameters in the format of the Stan backends."""
+        S = self.S
+        params = {
+            'k': theta[0],
+            'm': theta[1],
+            'delta': theta[2:2 + S] - theta[2 + S:2 + 2 * S],
+            'beta': theta[2 + 2 * S:-1],
+            'sigma_obs': np.exp(theta[-1]),
+        }
+        return {
+            par: np.asarray(value, dtype=float).reshape((1, -1))
+            for par, value in params.items()
+        }
+
+    def objective(self, theta):
+        """Negative log posterior and its gradient.
+
+        Parameters
+        ----------
+        theta: Vector of parameters, as returned by pack.
+
+        Returns
+        -------
+        A tuple (f, grad) with the objective and its gradient.
+        """
+        S = self.S
+        k = theta[0]
+        m = theta[1]
+        delta_pos = theta[2:2 + S]
+        delta_neg = theta[2 + S:2 + 2 * S]
+        delta = delta_pos - delta_neg
+        beta = theta[2 + 2 * S:-1]
+        log_sigma = theta[-1]
+        sigma = np.exp(log_sigma)
+
+        change = self.Phi @ delta
+        if self.logistic:
+            z = k * (self.t - m) + change
+            p = 1. / (1. + np.exp(-z))
+            trend = self.cap * p
+        else:
+            trend = k * self.t + m + change
+
+        Xb_m = self.X @ (beta * self.s_m)
+        Xb_a = self.X @ (beta * self.s_a)
+        resid = trend * (1 + Xb_m) + Xb_a - self.y
+        sse = resid @ resid
+        inv_var = np.exp(-2 * log_sigma)
+
+        f = (
+            0.5 * (k / K_PRIOR_SCALE) ** 2
+            + 0.5 * (m / M_PRIOR_SCALE) ** 2
+            + np.sum(delta_pos + delta_neg) / self.tau
+            + 0.5 * (sigma / SIGMA_PRIOR_SCALE) ** 2
+            + 0.5 * np.sum((beta / self.sigmas) ** 2)
+            + self.n_obs * log_sigma
+            + 0.5 * sse * inv_var
+        )
+
+        # Gradient of the likelihood with respect to yhat and trend
+        r = resid * inv_var
+        r_trend = r * (1 + Xb_m)
+
+        grad = np.zeros_like(theta)
+        if self.logistic:
+            r_z = r_trend * self.cap * p * (1 - p)
+            grad[0] = r_z @ (self.t - m)
+            grad[1] = -k * np.sum(r_z)
+            grad_change = r_z
+        else:
+            grad[0] = r_trend @ self.t
+            grad[1] = np.sum(r_trend)
+            grad_change = r_trend
+        grad[0] += k / K_PRIOR_SCALE ** 2
+        grad[1] += m / M_PRIOR_SCALE ** 2
+        grad_delta = grad_change @ self.Phi
+        grad[2:2 + S] = grad_delta + 1. / self.tau
+        grad[2 + S:2 + 2 * S] = -grad_delta + 1. / self.tau
+        grad[2 + 2 * S:-1] = (
+            ((r * trend) @ self.X) * self.s_m
+            + (r @ self.X) * self.s_a
+            + beta / self.sigmas ** 2
+        )
+        grad[-1] = self.n_obs - sse * inv_var + (sigma / SIGMA_PRIOR_SCALE) ** 2
+        return f, grad
+
+
+def fit_map(stan_init, stan_data, maxiter=10000, **kwargs):
+    """Fit the MAP estimate of a Prophet model.
+
+    Parameters
+    ----------
+    stan_init: Dictionary with the initial values of the parameters, as
+        returned by Prophet.preprocess.
+    stan_data: Dictionary with the data for the Stan model, as returned by
+        Prophet.preprocess.
+    maxiter: Maximum number of iterations of the optimizer.
+    kwargs: Additional options passed to scipy.optimize.minimize for the
+        L-BFGS-B method.
+
+    Returns
+    -------
+    Dictionary with the parameters, in the format returned by the Stan
+    backends.
+    """
+    # The trend parameters are strongly correlated, which makes the
+    # objective flat along some directions. Stop on the gradient rather than
+    # on the relative reduction of the objective, which stops far from the
+    # optimum, and keep a longer history of the L-BFGS updates than the
+    # default of scipy, which takes fewer iterations.
+    options = {'maxiter': maxiter, 'maxcor': 30,
+               'ftol': np.finfo(float).eps, 'gtol': 1e-5}
+    options.update(kwargs)
+
+    data = ModelData(stan_data)
+    result = minimize(data.objective, data.pack(stan_init), jac=True,
+                      method='L-BFGS-B', bounds=data.bounds(), options=options)
+    logger.debug('L-BFGS-B stopped after %d iterations: %s',
+                 result.nit, result.message)
+    return data.unpack(result.x)
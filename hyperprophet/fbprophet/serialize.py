@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) Facebook, Inc. and its affiliates.
+
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""Serialization of fitted Prophet models.
+
+Only what is needed to predict is stored: the parameters, the scaling of the
+history, the changepoints, the seasonality, holiday and regressor
+specifications and the component columns. The history itself is optional.
+Loading a model rebuilds it with the NUMPY backend, without loading Stan.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import json
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .forecaster import Prophet
+
+SERIALIZATION_VERSION = 1
+
+SIMPLE_ATTRIBUTES = [
+    'growth', 'n_changepoints', 'specified_changepoints', 'changepoint_range',
+    'yearly_seasonality', 'weekly_seasonality', 'daily_seasonality',
+    'seasonality_mode', 'seasonality_prior_scale', 'changepoint_prior_scale',
+    'holidays_prior_scale', 'mcmc_samples', 'interval_width',
+    'uncertainty_samples', 'y_scale', 'logistic_floor', 'country_holidays',
+    'component_modes',
+]
+ORDEREDDICT = ['seasonalities', 'extra_regressors']
+META_KEY = '__meta__'
+
+
+def model_to_bytes(model, include_history=False):
+    """Serialize a fitted Prophet model to bytes.
+
+    The model is stored in the compressed npz format of NumPy, with the
+    specification of the model as JSON and every array in its own member.
+
+    Parameters
+    ----------
+    model: Fitted Prophet model.
+    include_history: Boolean to store the history of the model. Without it,
+        the loaded model can only predict for the dataframe given to
+        predict, and not on its history.
+
+    Returns
+    -------
+    bytes.
+    """
+    meta, arrays = _model_to_arrays(model, include_history)
+    arrays[META_KEY] = np.frombuffer(
+        json.dumps(meta, default=_to_builtin).encode('utf-8'), dtype=np.uint8)
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **arrays)
+    return buf.getvalue()
+
+
+def model_from_bytes(data):
+    """Load a Prophet model serialized with model_to_bytes.
+
+    Parameters
+    ----------
+    data: bytes.
+
+    Returns
+    -------
+    Prophet model, ready to predict.
+    """
+    with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+        arrays = {name: npz[name] for name in npz.files}
+    meta = json.loads(arrays.pop(META_KEY).tobytes().decode('utf-8'))
+    return _model_from_arrays(meta, arrays)
+
+
+def model_to_json(model, include_history=False):
+    """Serialize a fitted Prophet model to a JSON string.
+
+    Parameters
+    ----------
+    model: Fitted Prophet model.
+    include_history: Boolean to store the history of the model, as in
+        model_to_bytes.
+
+    Returns
+    -------
+    JSON string.
+    """
+    meta, arrays = _model_to_arrays(model, include_history)
+    model_json = {
+        'meta': meta,
+        'arrays': {name: _array_to_json(a) for name, a in arrays.items()},
+    }
+    return json.dumps(model_json, default=_to_builtin)
+
+
+def model_from_json(model_json):
+    """Load a Prophet model serialized with model_to_json.
+
+    Parameters
+    ----------
+    model_json: JSON string.
+
+    Returns
+    -------
+    Prophet model, ready to predict.
+    """
+    model_json = json.loads(model_json)
+    arrays = {
+        name: _array_from_json(a) for name, a in model_json['arrays'].items()
+    }
+    return _model_from_arrays(model_json['meta'], arrays)
+
+
+def _model_to_arrays(model, include_history):
+    if model.history is None or not model.params:
+        raise ValueError(
+            'This can only be used to serialize models that have already '
+            'been fit.'
+        )
+    from . import __version__
+
+    meta = {
+        'version': SERIALIZATION_VERSION,
+        'fbprophet_version': __version__,
+    }
+    for attribute in SIMPLE_ATTRIBUTES:
+        meta[attribute] = getattr(model, attribute)
+    for attribute in ORDEREDDICT:
+        meta[attribute] = list(getattr(model, attribute).items())
+    meta['start'] = model.start.isoformat()
+    meta['t_scale'] = int(model.t_scale.value)
+    meta['params'] = list(model.params)
+    meta['seed'] = _seed_to_json(model.seed)
+    meta['train_component_cols'] = list(model.train_component_cols.columns)
+    meta['train_feature_names'] = model.train_feature_names
+
+    arrays = OrderedDict()
+    for name, value in model.params.items():
+        arrays['params/' + name] = np.asarray(value)
+    arrays['changepoints'] = np.asarray(model.changepoints, dtype='datetime64[ns]')
+    arrays['changepoints_t'] = np.asarray(model.changepoints_t, dtype=float)
+    arrays['history_dates'] = np.asarray(model.history_dates, dtype='datetime64[ns]')
+    arrays['train_component_cols'] = model.train_component_cols.values
+    if model.train_holiday_names is not None:
+        arrays['train_holiday_names'] = np.asarray(
+            model.train_holiday_names, dtype=str)
+
+    history = model.history if include_history else model.history.iloc[:0]
+    meta['history'] = _frame_to_arrays(history, 'history', arrays)
+    if model.holidays is not None:
+        meta['holidays'] = _frame_to_arrays(model.holidays, 'holidays', arrays)
+    else:
+        meta['holidays'] = None
+    return meta, arrays
+
+
+def _model_from_arrays(meta, arrays):
+    if meta.get('version', 0) > SERIALIZATION_VERSION:
+        raise ValueError(
+            'The model was serialized with version {} of the format, which '
+            'is newer than the supported version {}.'.format(
+                meta['version'], SERIALIZATION_VERSION)
+        )
+
+    # The attributes set in __init__ are all overwritten below
+    model = Prophet(stan_backend='NUMPY')
+    for attribute in SIMPLE_ATTRIBUTES:
+        setattr(model, attribute, meta[attribute])
+    for attribute in ORDEREDDICT:
+        setattr(model, attribute, OrderedDict(meta[attribute]))
+    model.start = pd.Timestamp(meta['start'])
+    model.t_scale = pd.Timedelta(meta['t_scale'])
+    model.seed = _seed_from_json(meta.get('seed'))
+    model.params = {
+        name: arrays['params/' + name] for name in meta['params']
+    }
+    model.changepoints = pd.Series(arrays['changepoints'], name='ds')
+    model.changepoints_t = arrays['changepoints_t']
+    model.history_dates = pd.Series(arrays['history_dates'], name='ds')
+    model.train_component_cols = pd.DataFrame(
+        arrays['train_component_cols'],
+        columns=pd.Index(meta['train_component_cols'], name='component'),
+    ).rename_axis('col')
+    model.train_feature_names = meta.get('train_feature_names')
+    if 'train_holiday_names' in arrays:
+        model.train_holiday_names = pd.Series(arrays['train_holiday_names'])
+    model.history = _frame_from_arrays(meta['history'], 'history', arrays)
+    if meta['holidays'] is not None:
+        model.holidays = _frame_from_arrays(meta['holidays'], 'holidays', arrays)
+    return model
+
+
+def _frame_to_arrays(df, prefix, arrays):
+    """Add the columns of df to arrays, and return their names.
+
+    Columns of strings are stored as unicode arrays. Other columns of
+    objects can't be stored without pickle and are left out.
+    """
+    columns = []
+    for column in df.columns:
+        values = df[column].values
+        if values.dtype == object:
+            if not all(isinstance(v, str) for v in values):
+                continue
+            values = values.astype(str)
+        arrays['{}/{}'.format(prefix, column)] = values
+        columns.append(column)
+    return columns
+
+
+def _frame_from_arrays(columns, prefix, arrays):
+    return pd.DataFrame(OrderedDict(
+        (column, arrays['{}/{}'.format(prefix, column)]) for column in columns
+    ))
+
+
+def _array_to_json(a):
+    if a.dtype.kind == 'M':
+        data = a.view('i8').tolist()
+    else:
+        data = a.tolist()
+    return {'dtype': a.dtype.str, 'shape': list(a.shape), 'data': data}
+
+
+def _array_from_json(a):
+    dtype = np.dtype(a['dtype'])
+    if dtype.kind == 'M':
+        values = np.array(a['data'], dtype='i8').view(dtype)
+    else:
+        values = np.array(a['data'], dtype=dtype)
+    return values.reshape(a['shape'])
+
+
+def _seed_to_json(seed):
+    if isinstance(seed, np.random.SeedSequence):
+        entropy = seed.entropy
+        if not isinstance(entropy, int):
+            entropy = [int(e) for e in entropy]
+        return {'entropy': entropy, 'spawn_key': list(seed.spawn_key),
+                'pool_size': seed.pool_size}
+    return seed
+
+
+def _seed_from_json(seed):
+    if isinstance(seed, dict):
+        return np.random.SeedSequence(
+            seed['entropy'], spawn_key=seed['spawn_key'],
+            pool_size=seed['pool_size'])
+    return seed
+
+
+def _to_builtin(value):
+    # json can't encode the numpy scalars
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError('Object of type {} is not JSON serializable'.format(
+        type(value).__name__))
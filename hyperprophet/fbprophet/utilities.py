@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) Facebook, Inc. and its affiliates.
+
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+
+def warm_start_params(m):
+    """Retrieve parameters from a trained model in the format used to
+    initialize a new Stan model.
+
+    Parameters
+    ----------
+    m: A trained Prophet model.
+
+    Returns
+    -------
+    A dictionary containing retrieved parameters of m. Posterior samples are
+    averaged when the model was fit with MCMC. The dictionary also has the
+    scaling of the history of m (y_scale, start and t_scale), so that the
+    parameters can be converted to the scaling of the new history.
+    """
+    res = {
+        'y_scale': m.y_scale,
+        'start': m.start,
+        't_scale': m.t_scale,
+    }
+    for pname in ['k', 'm', 'sigma_obs', 'delta', 'beta']:
+        value = np.asarray(m.params[pname], dtype=float)
+        value = value.reshape((value.shape[0], -1)).mean(axis=0)
+        if pname in ['delta', 'beta']:
+            res[pname] = value
+        else:
+            res[pname] = float(value[0])
+    return res
+
+
+def spawn_seed(seed, key):
+    """Derive an independent seed from a seed and a key.
+
+    Unlike np.random.SeedSequence.spawn, the derived seed only depends on
+    the seed and the key, not on the number of seeds spawned before, so it
+    is the same in every process.
+
+    Parameters
+    ----------
+    seed: int or np.random.SeedSequence.
+    key: Non-negative int identifying the derived seed.
+
+    Returns
+    -------
+    np.random.SeedSequence.
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return np.random.SeedSequence(
+        seed.entropy,
+        spawn_key=tuple(seed.spawn_key) + (key,),
+        pool_size=seed.pool_size,
+    )
+
+
+def fourier_components(t, period, series_order):
+    """Fourier series components of t with the given period and order.
+
+    Only the first harmonic is computed with sin and cos. The higher ones
+    follow from the angle addition formulas, as rotations by the first,
+    whose error grows slowly with the order.
+
+    Parameters
+    ----------
+    t: np.array of times, in days.
+    period: Number of days of the period.
+    series_order: Number of components.
+
+    Returns
+    -------
+    Matrix with the columns sin(2 pi i t / period), cos(2 pi i t / period)
+    for i = 1..series_order.
+    """
+    x = 2.0 * np.pi * t / period
+    sin1, cos1 = np.sin(x), np.cos(x)
+    # Every component is a contiguous row, the matrix is its transpose
+    components = np.empty((2 * series_order, len(t)))
+    if series_order > 0:
+        components[0], components[1] = sin1, cos1
+    for i in range(1, series_order):
+        sin_prev, cos_prev = components[2 * i - 2], components[2 * i - 1]
+        sin_i, cos_i = components[2 * i], components[2 * i + 1]
+        np.multiply(sin_prev, cos1, out=sin_i)
+        sin_i += cos_prev * sin1
+        np.multiply(cos_prev, cos1, out=cos_i)
+        cos_i -= sin_prev * sin1
+    return components.T
@@ -1,3 +1,6 @@
+import copy
+import numbers
+import numpy as np
 import pandas as pd
 from . import fbprophet
 from . import engines
@@ -10,10 +13,13 @@ class Prophet(fbprophet.Prophet):
         kwargs.setdefault("daily_seasonality", False)
 
         super().__init__(*args, **kwargs)
+        self.seed = self._int_seed(self.seed)
         self.fit_df = None
         self.fit_kwargs = None
         self.keys = None
         self.engine = engines.make_engine(engine)
+        self.models = None
+        self.models_options = None
 
     def validate_inputs(self):
         super().validate_inputs()
@@ -25,6 +31,24 @@ class Prophet(fbprophet.Prophet):
         if self.daily_seasonality == 'auto':
             raise ValueError("Hyperprophet doesn't support daily_seasonality=auto")
 
+    @staticmethod
+    def _int_seed(seed):
+        """Returns the seed as an int, which is sent to the engine in the
+        options, and to the remote service as JSON.
+
+        A np.random.SeedSequence is used to draw an int seed once, like a
+        np.random.Generator.
+        """
+        if seed is None:
+            return None
+        if isinstance(seed, np.random.SeedSequence):
+            return int(seed.generate_state(1, np.uint64)[0])
+        if isinstance(seed, numbers.Integral) and not isinstance(seed, bool) and seed >= 0:
+            return int(seed)
+        raise ValueError(
+            "seed must be a non-negative int, a np.random.SeedSequence or a "
+            "np.random.Generator, got {!r}".format(seed))
+
     def _get_options(self) -> Dict[str, Any]:
         """Returns the options/parameters pased to the Prophet.
 
@@ -32,7 +56,7 @@ class Prophet(fbprophet.Prophet):
         on the remote server with these options.
         """
         # TODO: handle holidays as well
-        return {
+        options = {
             "growth": self.growth,
             "changepoints": self.changepoints and list(self.changepoints.astype('str')),
             "n_changepoints": self.n_changepoints,
@@ -50,6 +74,10 @@ class Prophet(fbprophet.Prophet):
             "seasonalities": self.seasonalities,
             "extra_regressors": self.extra_regressors
         }
+        # Only set when given, so the options without a seed are unchanged
+        if self.seed is not None:
+            options["seed"] = self.seed
+        return options
 
     def _load_stan_backend(self, stan_backend):
         # Disable loading stan backend
@@ -61,12 +89,39 @@ class Prophet(fbprophet.Prophet):
         self.keys = df['key'].unique()
         self.fit_df = df
         self.fit_kwargs = kwargs
+        self.models = None
         return self
 
     def predict(self, df=None):
         options = self._get_options()
+        if self.engine.supports_models:
+            return self.engine.predict_models(self._get_models(options), df)
         return self.engine.forecast(self.fit_df, df, options)
 
+    def predict_iter(self, df=None):
+        """Predicts like predict, but yields a tuple (key, forecast_df) for
+        each key as soon as its forecast is available.
+
+        This avoids holding the forecasts of all the keys in memory at once.
+        """
+        options = self._get_options()
+        if self.engine.supports_models:
+            return self.engine.predict_models_iter(self._get_models(options), df)
+        return self.engine.forecast_iter(self.fit_df, df, options)
+
+    def _get_models(self, options):
+        """Returns the fitted model of every key, fitting them on the first
+        call and whenever the options have changed since.
+
+        Later predictions only evaluate the fitted models on the new dates.
+        """
+        if self.models is None or self.models_options != options:
+            self.models = self.engine.fit_models(self.fit_df, options)
+            # options shares the seasonalities with self, keep a copy to
+            # notice when they change
+            self.models_options = copy.deepcopy(options)
+        return self.models
+
     def make_future_dataframe(self, periods, freq='D', include_history=True):
         keys = pd.DataFrame({"key": self.keys})
         df = super().make_future_dataframe(periods=periods, freq=freq, include_history=include_history)
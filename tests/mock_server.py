@@ -0,0 +1,239 @@
+"""Mock of the hyperprophet service, to test the remote engines.
+
+The server runs on a background thread and keeps its jobs in memory. A job
+runs when its status has been polled job_polls times after it is started,
+and computes its forecast using ZeroEngine.
+
+    with MockServer() as server:
+        engine = HyperprophetEngine(api_token="token", endpoint_url=server.url)
+        server.fail("GET", "/jobs.info", status=503, times=2)
+        ...
+"""
+import io
+import json
+import re
+import threading
+import uuid
+import zipfile
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from hyperprophet.engines import ZeroEngine
+
+class MockServer:
+    """Mock of the hyperprophet service.
+
+    Parameters
+    ----------
+    row_group_size:
+        Number of rows in each row group of the results of the jobs.
+
+    ranges:
+        Whether the results can be downloaded using HTTP range requests.
+
+    chunked_uploads:
+        Whether uploads with chunked transfer encoding are accepted. Like
+        presigned object store URLs, the server responds with 411 Length
+        Required to them when False.
+
+    job_polls:
+        Number of polls of the status of a job after which it runs. Its
+        progress grows evenly with the polls before.
+    """
+    def __init__(self, row_group_size=2, ranges=True, chunked_uploads=True, job_polls=1):
+        self.row_group_size = row_group_size
+        self.ranges = ranges
+        self.chunked_uploads = chunked_uploads
+        self.job_polls = job_polls
+        # the wait parameter of the long polls of the status of the jobs
+        self.waits = []
+        self.jobs = {}
+        self.requests = Counter()
+        self.range_requests = 0
+        self.failures = []
+        self.failed_jobs = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(self))
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}".format(self.httpd.server_address[1])
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def fail(self, method, path, status=503, times=1):
+        """Responds with the given HTTP status to the next times requests
+        for path.
+        """
+        self.failures.append({"method": method, "path": path, "status": status, "times": times})
+
+    def fail_jobs(self, times=1):
+        """Makes the next times jobs that run end with status FAILED.
+        """
+        self.failed_jobs += times
+
+    def count(self, method, path):
+        """Returns the number of requests received for path.
+        """
+        return self.requests[method, path]
+
+    def _failure(self, method, path):
+        with self.lock:
+            self.requests[method, path] += 1
+            for failure in self.failures:
+                if failure["method"] == method and failure["path"] == path and failure["times"] > 0:
+                    failure["times"] -= 1
+                    return failure["status"]
+
+    def _run(self, job):
+        with self.lock:
+            if job["status"] != "RUNNING":
+                return
+            job["polls"] += 1
+            if job["polls"] < self.job_polls:
+                job["progress"] = job["polls"] / self.job_polls
+                return
+            if self.failed_jobs:
+                self.failed_jobs -= 1
+                job["status"] = "FAILED"
+                return
+        with zipfile.ZipFile(io.BytesIO(job["payload"])) as z:
+            df_fit = pd.read_parquet(io.BytesIO(z.read("train.parq")))
+            df_predict = pd.read_parquet(io.BytesIO(z.read("predict.parq")))
+        df = ZeroEngine().forecast(df_fit, df_predict, job["options"])
+        buf = io.BytesIO()
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), buf,
+                       row_group_size=self.row_group_size)
+        job.update(result=buf.getvalue(), status="SUCCESS", progress=1.0)
+
+def _make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        @property
+        def base_url(self):
+            return server.url
+
+        def read_body(self):
+            if self.headers.get("Transfer-Encoding") == "chunked":
+                chunks = []
+                while True:
+                    size = int(self.rfile.readline().strip(), 16)
+                    if size == 0:
+                        self.rfile.readline()
+                        return b"".join(chunks)
+                    chunks.append(self.rfile.read(size))
+                    self.rfile.readline()
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def respond(self, status, body, content_type="application/json", headers=None):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def handle_request(self, method):
+            url = urlparse(self.path)
+            body = self.read_body() if method in ("POST", "PUT") else b""
+            status = server._failure(method, url.path)
+            if status is not None:
+                return self.respond(status, b"mock failure", "text/plain")
+            getattr(self, "handle_" + method.lower())(url.path, parse_qs(url.query), body)
+
+        def do_GET(self):
+            self.handle_request("GET")
+
+        def do_POST(self):
+            self.handle_request("POST")
+
+        def do_PUT(self):
+            self.handle_request("PUT")
+
+        def job_info(self, job):
+            return {
+                "ok": True,
+                "job": {k: job[k] for k in ("id", "status", "progress", "data_upload_url")}
+            }
+
+        def handle_post(self, path, query, body):
+            data = json.loads(body or b"{}")
+            if path == "/jobs.create":
+                job_id = uuid.uuid4().hex
+                server.jobs[job_id] = {
+                    "id": job_id,
+                    "status": "CREATED",
+                    "progress": 0.0,
+                    "polls": 0,
+                    "options": data["options"],
+                    "data_upload_url": self.base_url + "/upload/" + job_id,
+                }
+                self.respond(200, self.job_info(server.jobs[job_id]))
+            elif path == "/jobs.start":
+                job = server.jobs[data["id"]]
+                job["status"] = "RUNNING"
+                self.respond(200, self.job_info(job))
+            else:
+                self.respond(404, b"not found", "text/plain")
+
+        def handle_put(self, path, query, body):
+            job = server.jobs[path.rsplit("/", 1)[1]]
+            chunked = self.headers.get("Transfer-Encoding") == "chunked"
+            if chunked and not server.chunked_uploads:
+                return self.respond(411, b"length required", "text/plain")
+            job["payload"] = body
+            job["chunked"] = chunked
+            self.respond(200, b"", "text/plain")
+
+        def handle_get(self, path, query, body):
+            if path == "/jobs.info":
+                job = server.jobs.get(query["id"][0])
+                if job is None:
+                    return self.respond(200, {"ok": False, "error": "job_not_found"})
+                if "wait" in query:
+                    server.waits.append(float(query["wait"][0]))
+                server._run(job)
+                self.respond(200, self.job_info(job))
+            elif path == "/jobs.result":
+                self.respond(200, {"ok": True, "download_url": self.base_url + "/download/" + query["id"][0]})
+            elif path.startswith("/download/"):
+                self.download(server.jobs[path.rsplit("/", 1)[1]]["result"])
+            else:
+                self.respond(404, b"not found", "text/plain")
+
+        def download(self, data):
+            byte_range = self.headers.get("Range")
+            if not byte_range or not server.ranges:
+                return self.respond(200, data, "application/octet-stream")
+            server.range_requests += 1
+            start, end = re.match(r"bytes=(\d*)-(\d*)", byte_range).groups()
+            if start == "":
+                start, end = max(0, len(data) - int(end)), len(data) - 1
+            else:
+                start, end = int(start), min(int(end or len(data) - 1), len(data) - 1)
+            self.respond(206, data[start:end + 1], "application/octet-stream",
+                         {"Content-Range": "bytes {}-{}/{}".format(start, end, len(data))})
+
+    return Handler